@@ -105,13 +105,10 @@ class RT0(DualElliptic):
         HB += HB.T
         HB /= sd.dim * sd.dim * (sd.dim + 1) * (sd.dim + 2)
 
-        # define the function to compute the inverse of the permeability matrix
-        if sd.dim == 1:
-            inv_matrix = self._inv_matrix_1d
-        elif sd.dim == 2:
-            inv_matrix = self._inv_matrix_2d
-        elif sd.dim == 3:
-            inv_matrix = self._inv_matrix_3d
+        # compute the inverse of the permeability matrix for all the cells at once
+        inv_k = self._inv_permeability(
+            sd, k.values[0 : sd.dim, 0 : sd.dim, :], matrix_dictionary
+        )
 
         # compute the oppisite node per face
         self._compute_cell_face_to_opposite_node(sd, data)
@@ -128,7 +125,7 @@ class RT0(DualElliptic):
 
             # Compute the H_div-mass local matrix
             A = RT0.massHdiv(
-                inv_matrix(k.values[0 : sd.dim, 0 : sd.dim, c]),
+                inv_k[:, :, c],
                 sd.cell_volumes[c],
                 coord_loc,
                 sign[loc],
@@ -163,13 +160,16 @@ class RT0(DualElliptic):
             idx_row_P += 3
 
         # Construct the global matrices
-        mass = sps.coo_matrix((data_A, (rows_A, cols_A)))
+        # The conversion sums the duplicate entries, thus the mass matrix is stored in
+        # canonical csr format.
+        mass = sps.coo_matrix((data_A, (rows_A, cols_A))).tocsr()
         div = -sd.cell_faces.T
         proj = sps.coo_matrix((data_P, (rows_P, cols_P)))
 
         matrix_dictionary[self.mass_matrix_key] = mass
         matrix_dictionary[self.div_matrix_key] = div
         matrix_dictionary[self.vector_proj_key] = proj
+        matrix_dictionary[self.vector_proj_transposed_key] = proj.T.tocsr()
 
     @staticmethod
     def massHdiv(
@@ -196,21 +196,19 @@ class RT0(DualElliptic):
         out: ndarray (num_faces_of_cell, num_faces_of_cell)
             Local mass Hdiv matrix.
         """
-        ind = np.eye(dim + 1)
-        # expand the inv_K tensor
-        inv_K_exp = (
-            ind[:, np.newaxis, :, np.newaxis]
-            * inv_K[np.newaxis, :, np.newaxis, :]
-            / c_volume
-        )
-        inv_K_exp.shape = (ind.shape[0] * inv_K.shape[0], ind.shape[1] * inv_K.shape[1])
-
         N = coord.flatten("F").reshape((-1, 1)) * np.ones(
             (1, dim + 1)
         ) - np.concatenate((dim + 1) * [coord])
         C = np.diag(sign)
+        NC = np.dot(N, C)
+
+        # Apply the inverse permeability to each of the dim + 1 row blocks of NC. This
+        # is the product with the block diagonal expansion of inv_K, which is thus
+        # never formed.
+        inv_K_NC = np.matmul(inv_K / c_volume, NC.reshape((dim + 1, dim, -1)))
+        inv_K_NC.shape = NC.shape
 
-        return np.dot(C.T, np.dot(N.T, np.dot(HB, np.dot(inv_K_exp, np.dot(N, C)))))
+        return np.dot(C.T, np.dot(N.T, np.dot(HB, inv_K_NC)))
 
     @staticmethod
     def faces_to_cell(
@@ -1255,6 +1255,9 @@ class Assembler:
             # Update local counting
             self._dof_manager.full_dof[index] = num_dofs
 
+        # The block sizes may have changed; refresh the cached block offsets.
+        self._dof_manager._update_dof_start()
+
     def _initialize_matrix_rhs(
         self, sps_matrix: Type[csc_or_csr_matrix]
     ) -> Tuple[Dict[str, csc_or_csr_matrix], Dict[str, np.ndarray]]:
@@ -3,12 +3,15 @@
 from __future__ import annotations
 
 import itertools
-from typing import Dict, List, Literal, Optional, Sequence, Tuple, Union
+from functools import cache
+from typing import Dict, List, Literal, Optional, Tuple, Union
+from warnings import warn
 
 import numpy as np
 import scipy.sparse as sps
 
 import porepy as pp
+from porepy.utils import mcolon
 
 csc_or_csr_matrix = Union[sps.csc_matrix, sps.csr_matrix]
 
@@ -18,6 +21,13 @@ __all__ = ["DofManager"]
 GridLike = Union[pp.Grid, pp.MortarGrid]
 
 
+@cache
+def _warn_deprecated() -> None:
+    """Issue the deprecation warning of the DofManager, once per process."""
+    msg = "The DofManager will be replaced by EquationSystem."
+    warn(msg, DeprecationWarning, stacklevel=3)
+
+
 class DofManager:
     """Class to keep track of degrees of freedom in a mixed-dimensional grid with
     several variables.
@@ -47,7 +57,7 @@ class DofManager:
                 mixed-dimensional grid.
 
         """
-        DeprecationWarning("The DofManager will be replaced by EquationSystem.")
+        _warn_deprecated()
         self.mdg = mdg
 
         # Counter for block index
@@ -60,7 +70,12 @@ class DofManager:
         # to the ordering specified in block_dof
         full_dof: List[int] = []
 
-        for sd, data in mdg.subdomains(return_data=True):
+        # Block indices of each variable, and the position of the grid of each block
+        # in the subdomain-then-interface ordering of the mixed-dimensional grid.
+        blocks_by_var: Dict[str, List[int]] = {}
+        block_grid_ind: List[int] = []
+
+        for grid_counter, (sd, data) in enumerate(mdg.subdomains(return_data=True)):
             if pp.PRIMARY_VARIABLES not in data:
                 continue
 
@@ -69,6 +84,8 @@ class DofManager:
                 # Note that the keys in the dictionary is a tuple, with a grid
                 # and a variable name (str)
                 block_dof[(sd, local_var)] = block_dof_counter
+                blocks_by_var.setdefault(local_var, []).append(block_dof_counter)
+                block_grid_ind.append(grid_counter)
                 block_dof_counter += 1
 
                 # Count number of dofs for this variable on this grid and store it.
@@ -80,7 +97,8 @@ class DofManager:
                 )
                 full_dof.append(total_local_dofs)
 
-        for intf, data in mdg.interfaces(return_data=True):
+        num_subdomains = mdg.num_subdomains()
+        for intf_counter, (intf, data) in enumerate(mdg.interfaces(return_data=True)):
             if pp.PRIMARY_VARIABLES not in data:
                 continue
 
@@ -89,6 +107,8 @@ class DofManager:
                 # First count the number of dofs per variable. Note that the
                 # identifier here is a tuple of the edge and a variable str.
                 block_dof[(intf, local_var)] = block_dof_counter
+                blocks_by_var.setdefault(local_var, []).append(block_dof_counter)
+                block_grid_ind.append(num_subdomains + intf_counter)
                 block_dof_counter += 1
 
                 # We only allow for cell variables on the mortar grid.
@@ -96,10 +116,44 @@ class DofManager:
                 total_local_dofs = intf.num_cells * local_dofs.get("cells", 0)
                 full_dof.append(total_local_dofs)
 
-        # Array version of the number of dofs per node/edge and variable
-        self.full_dof: np.ndarray = np.array(full_dof)
+        # Array version of the number of dofs per node/edge and variable. The dtype is
+        # fixed to avoid platform dependent integer sizes.
+        self.full_dof: np.ndarray = np.fromiter(
+            full_dof, dtype=np.int64, count=len(full_dof)
+        )
         self.block_dof: Dict[Tuple[GridLike, str], int] = block_dof
 
+        self._blocks_by_var: Dict[str, List[int]] = blocks_by_var
+        self._block_grid_ind: np.ndarray = np.array(block_grid_ind, dtype=int)
+
+        # Data dictionary of the subdomain or interface of each block.
+        self._data_for_block: Dict[Tuple[GridLike, str], Dict] = {}
+        for g, var in block_dof:
+            if isinstance(g, pp.MortarGrid):
+                self._data_for_block[(g, var)] = mdg.interface_data(g)
+            else:
+                self._data_for_block[(g, var)] = mdg.subdomain_data(g)
+
+        self._update_dof_start()
+
+    def _update_dof_start(self) -> None:
+        """Update the cached start index of each block in the global system.
+
+        Must be called whenever self.full_dof is modified.
+
+        """
+        # Prefix sum of the block sizes, with a leading zero. The end of block i is
+        # the start of block i + 1.
+        dof_start = np.zeros(self.full_dof.size + 1, dtype=np.int64)
+        np.cumsum(self.full_dof, out=dof_start[1:])
+        self._dof_start: np.ndarray = dof_start
+
+        # Slices into the global vector for each block, indexed by block index.
+        self._block_slices: List[slice] = [
+            slice(int(dof_start[i]), int(dof_start[i + 1]))
+            for i in range(self.full_dof.size)
+        ]
+
     def dofs_of(self, variables: list[pp.ad.Variable]) -> np.ndarray:
         """Get the indices in the global vector of unknowns belonging to the variables.
 
@@ -145,8 +199,7 @@ class DofManager:
 
         """
         block_ind = self.block_dof[(grid, variable)]
-        dof_start = np.hstack((0, np.cumsum(self.full_dof)))
-        return np.arange(dof_start[block_ind], dof_start[block_ind + 1])
+        return np.arange(self._dof_start[block_ind], self._dof_start[block_ind + 1])
 
     def grid_and_variable_block_range(
         self,
@@ -287,7 +340,7 @@ class DofManager:
             ValueError: If the given index is negative or larger than the system size.
 
         """
-        dof_start = np.hstack((0, np.cumsum(self.full_dof)))
+        dof_start = self._dof_start
 
         if ind >= dof_start[-1]:
             raise ValueError(f"Index {ind} is larger than system size {dof_start[-1]}")
@@ -337,11 +390,8 @@ class DofManager:
 
         # loop over all blocks and process those requested
         # this ensures uniqueness and correct order
-        for grid, name in self.block_dof.items():
-            if isinstance(grid, pp.Grid):
-                data: dict = self.mdg.subdomain_data(grid)
-            elif isinstance(grid, pp.MortarGrid):
-                data = self.mdg.interface_data(grid)
+        for grid, name in self.block_dof:
+            data = self._data_for_block[(grid, name)]
             # extract a copy of requested values
             try:
                 if from_iterate:
@@ -379,8 +429,7 @@ class DofManager:
 
         """
         block_ind = self.block_dof[(g, variable)]
-        dof_start = np.hstack((0, np.cumsum(self.full_dof)))
-        return (dof_start[block_ind], dof_start[block_ind + 1])
+        return (self._dof_start[block_ind], self._dof_start[block_ind + 1])
 
     def _dof_range_from_grid_and_var(self, g: GridLike, variable: str):
         """Helper function to get the indices for a grid-variable combination.
@@ -398,6 +447,42 @@ class DofManager:
         dof_range: np.ndarray = np.arange(block_range[0], block_range[1])
         return dof_range
 
+    def _blocks_of_grids_and_variables(
+        self,
+        grids: Optional[List[GridLike]] = None,
+        variables: Optional[List[str]] = None,
+    ) -> List[Tuple[Tuple[GridLike, str], int]]:
+        """Helper function to get the grid-variable combinations that are present in
+        self.block_dof, together with their block indices.
+
+        Parameters:
+            grids (list of pp.Grid or pp.MortarGrid, optional): Grids to be considered.
+                If not provided, all grids found in self.block_dof will be considered.
+            variables (list of str, optional): Names of variables to be considered. If
+                not provided, all variables found in self.block_dof will be considered.
+
+        Returns:
+            list of tuple: Keys in self.block_dof for the grid-variable combinations,
+                and the corresponding block indices.
+
+        """
+        if grids is None and variables is None:
+            # No filtering, all blocks are considered.
+            return list(self.block_dof.items())
+
+        if grids is None:
+            grids = list(set([key[0] for key in self.block_dof]))
+        if variables is None:
+            variables = list(set([key[1] for key in self.block_dof]))
+
+        # Look up each combination once; combinations not in block_dof are skipped.
+        blocks = []
+        for key in itertools.product(grids, variables):
+            block_ind = self.block_dof.get(key)
+            if block_ind is not None:
+                blocks.append((key, block_ind))
+        return blocks
+
     def dof_var(
         self,
         var: Union[List[str], str],
@@ -423,20 +508,27 @@ class DofManager:
         """
         if not isinstance(var, list):
             var = [var]  # type: ignore
-        dofs = np.empty(0, dtype=int)
-        dof_start = np.hstack((0, np.cumsum(self.full_dof)))
 
-        grids: Sequence[GridLike] = [sd for sd in self.mdg.subdomains()] + [
-            intf for intf in self.mdg.interfaces()  # type: ignore
-        ]
-        for g in grids:
-            for v in var:
-                if (g, v) in self.block_dof:
-                    block_ind = self.block_dof[(g, v)]
-                    local_dofs = np.arange(
-                        dof_start[block_ind], dof_start[block_ind + 1]
-                    )
-                    dofs = np.hstack((dofs, local_dofs))
+        # Collect the blocks of all requested variables, together with the position
+        # of the variable in the input list.
+        blocks_list: List[int] = []
+        var_ind_list: List[int] = []
+        for vi, v in enumerate(var):
+            var_blocks = self._blocks_by_var.get(v, [])
+            blocks_list += var_blocks
+            var_ind_list += [vi] * len(var_blocks)
+
+        if len(blocks_list) > 0:
+            blocks = np.array(blocks_list, dtype=int)
+            # Order the blocks by grid (subdomains before interfaces), then by the
+            # order of the variables in the input list.
+            order = np.lexsort((var_ind_list, self._block_grid_ind[blocks]))
+            blocks = blocks[order]
+            dofs = mcolon.mcolon(
+                self._dof_start[blocks], self._dof_start[blocks + 1]
+            ).astype(int)
+        else:
+            dofs = np.empty(0, dtype=int)
 
         if return_projection:
             projection = matrix_format(
@@ -489,24 +581,12 @@ class DofManager:
                 at the end of a time step.
 
         """
-        if grids is None:
-            grids = list(set([key[0] for key in self.block_dof]))
-
-        if variables is None:
-            variables = list(set([key[1] for key in self.block_dof]))
-
         # Loop over grid-variable combinations and update data in pp.STATE or pp.ITERATE
-        for g, var in itertools.product(grids, variables):
-            if (g, var) not in self.block_dof:
-                continue
-
-            dof_ind = self.grid_and_variable_to_dofs(g, var)
-
-            if isinstance(g, pp.MortarGrid):
-                # This is really an edge
-                data = self.mdg.interface_data(g)
-            else:
-                data = self.mdg.subdomain_data(g)
+        for (g, var), block_ind in self._blocks_of_grids_and_variables(
+            grids, variables
+        ):
+            dof_ind = self._block_slices[block_ind]
+            data = self._data_for_block[(g, var)]
 
             if pp.STATE not in data:
                 data[pp.STATE] = {}
@@ -535,6 +615,7 @@ class DofManager:
         grids: Optional[List[GridLike]] = None,
         variables: Optional[List[str]] = None,
         from_iterate: bool = False,
+        return_subvector: bool = False,
     ) -> np.ndarray:
         """Assemble a vector from the variable state stored in nodes and edges in
         the MixedDimensionalGrid.
@@ -549,38 +630,46 @@ class DofManager:
             from_iterate (bool, optional): If True, assemble from iterates, and not the
                 state itself. Set this to True inside a non-linear scheme (Newton), False
                 at the end of a time step.
+            return_subvector (bool, optional): If True, only the values of the active
+                grid-variable combinations are returned, ordered as in the global
+                system. This avoids allocating a vector of the full system size when
+                a small subset of the variables is requested. Defaults to False.
 
         Returns:
             np.ndarray: Vector, size equal to self.num_dofs(). Values taken from the
                 state for those indices corresponding to an active grid-variable
-                combination. Other values are set to zero.
+                combination. Other values are set to zero. If return_subvector is
+                True, the vector instead contains only the values of the active
+                combinations, and has size equal to the number of their dofs.
 
         """
-        if grids is None:
-            grids = list(set([key[0] for key in self.block_dof]))
-
-        if variables is None:
-            variables = list(set([key[1] for key in self.block_dof]))
-
-        values = np.zeros(self.num_dofs())
-
-        for g, var in itertools.product(grids, variables):
-            if (g, var) not in self.block_dof:
-                continue
-
-            dof_ind = self.grid_and_variable_to_dofs(g, var)
+        blocks = self._blocks_of_grids_and_variables(grids, variables)
+
+        if return_subvector:
+            # Sort the blocks according to the global ordering, and compute the
+            # position of each block in the subvector.
+            blocks = sorted(blocks, key=lambda block: block[1])
+            block_inds = [block_ind for _, block_ind in blocks]
+            sub_start = np.zeros(len(block_inds) + 1, dtype=np.int64)
+            np.cumsum(self.full_dof[block_inds], out=sub_start[1:])
+            values = np.empty(sub_start[-1])
+            slices = [
+                slice(int(sub_start[i]), int(sub_start[i + 1]))
+                for i in range(len(block_inds))
+            ]
+        else:
+            values = np.zeros(self.num_dofs())
+            slices = [self._block_slices[block_ind] for _, block_ind in blocks]
 
-            if isinstance(g, pp.MortarGrid):
-                # This is really an edge
-                data = self.mdg.interface_data(g)
-            else:
-                data = self.mdg.subdomain_data(g)
+        for ((g, var), _), dof_ind in zip(blocks, slices):
+            data = self._data_for_block[(g, var)]
 
             if from_iterate:
-                # Use copy to avoid nasty bugs.
-                values[dof_ind] = data[pp.STATE][pp.ITERATE][var].copy()
+                # Assignment to a slice copies the values, thus there is no need for
+                # an explicit copy.
+                values[dof_ind] = data[pp.STATE][pp.ITERATE][var]
             else:
-                values[dof_ind] = data[pp.STATE][var].copy()
+                values[dof_ind] = data[pp.STATE][var]
 
         return values
 
@@ -7,6 +7,7 @@ from __future__ import annotations
 from typing import Optional
 from warnings import warn
 
+import numba
 import numpy as np
 import scipy.sparse as sps
 
@@ -14,6 +15,266 @@ import porepy as pp
 from porepy.numerics.interface_laws.elliptic_discretization import (
     EllipticDiscretization,
 )
+from porepy.utils.mcolon import mcolon
+
+# Names of deprecated methods for which a warning has already been issued.
+_deprecation_warned: set[str] = set()
+
+
+def _warn_deprecated(method: str) -> None:
+    """Issue a deprecation warning for the assembly of internal boundary terms.
+
+    The warning is only issued the first time each of the methods is called.
+
+    Parameters:
+        method (str): Name of the deprecated method.
+
+    """
+    if method in _deprecation_warned:
+        return
+    _deprecation_warned.add(method)
+
+    msg = """This function is deprecated and will be removed, most likely in the
+    second half of 2022.
+
+    To assemble mixed-dimensional elliptic problems, the recommended solution is
+    either to use the models, or to use the automatic differentiation framework
+    directly.
+    """
+    warn(msg, DeprecationWarning, stacklevel=3)
+
+
+def _face_sign(sd: pp.Grid) -> np.ndarray:
+    """Get the sign of the normal vector of each face, relative to the first cell
+    (in the ordering of sd.cell_faces) which the face belongs to.
+
+    The signs depend on the topology of the grid only, and are therefore cached on the
+    grid. If the cell_faces matrix is replaced, e.g. when the grid is split along
+    fractures, the signs are recomputed.
+
+    Parameters:
+        sd (pp.Grid): Grid.
+
+    Returns:
+        np.ndarray (sd.num_faces): Sign of each face.
+
+    """
+
+    def compute() -> np.ndarray:
+        # The first cell of a face is the one with the lowest index. In csr format,
+        # with one row per face and sorted column indices, this is the first entry of
+        # each row.
+        face_cells = sd.cell_faces.tocsr()
+        face_cells.sum_duplicates()
+        return face_cells.data[face_cells.indptr[:-1]]
+
+    return pp.grid_utils.cached_on_grid(sd, "face_sign", compute)
+
+
+def _inf_norm(A: sps.spmatrix) -> float:
+    """Compute the infinity norm, that is, the maximum absolute row sum, of a sparse
+    matrix.
+
+    The result equals sps.linalg.norm(A, np.inf), but is computed directly from the
+    stored entries of the matrix.
+
+    Parameters:
+        A (sps.spmatrix): Matrix.
+
+    Returns:
+        float: The infinity norm of the matrix.
+
+    """
+    A = A.tocsr()
+    if not A.has_canonical_format:
+        # Duplicate entries must be summed before the absolute values are taken. The
+        # input matrix is left untouched.
+        A = A.copy()
+        A.sum_duplicates()
+    if A.nnz == 0:
+        return 0.0
+    # Sum the absolute values row-wise. Empty rows are skipped, they do not contribute
+    # to the maximum.
+    starts = A.indptr[:-1][np.diff(A.indptr) > 0]
+    return np.add.reduceat(np.abs(A.data), starts).max()
+
+
+def _append_zero_rows(A: sps.csr_matrix, num_rows: int) -> sps.csr_matrix:
+    """Append empty rows below a csr matrix.
+
+    Equivalent to sps.bmat([[A], [sps.csr_matrix((num_rows, A.shape[1]))]]), but
+    constructed directly from the compressed storage of A, which is shared with the
+    returned matrix.
+
+    Parameters:
+        A (sps.csr_matrix): Matrix.
+        num_rows (int): Number of empty rows to append.
+
+    Returns:
+        sps.csr_matrix: Matrix of shape (A.shape[0] + num_rows, A.shape[1]).
+
+    """
+    indptr = np.hstack((A.indptr, np.full(num_rows, A.indptr[-1])))
+    return sps.csr_matrix(
+        (A.data, A.indices, indptr), shape=(A.shape[0] + num_rows, A.shape[1])
+    )
+
+
+def _prepend_zero_rows(A: sps.csr_matrix, num_rows: int) -> sps.csr_matrix:
+    """Prepend empty rows above a csr matrix.
+
+    Equivalent to sps.bmat([[sps.csr_matrix((num_rows, A.shape[1]))], [A]]), but
+    constructed directly from the compressed storage of A, which is shared with the
+    returned matrix.
+
+    Parameters:
+        A (sps.csr_matrix): Matrix.
+        num_rows (int): Number of empty rows to prepend.
+
+    Returns:
+        sps.csr_matrix: Matrix of shape (num_rows + A.shape[0], A.shape[1]).
+
+    """
+    indptr = np.hstack((np.zeros(num_rows, dtype=A.indptr.dtype), A.indptr))
+    return sps.csr_matrix(
+        (A.data, A.indices, indptr), shape=(num_rows + A.shape[0], A.shape[1])
+    )
+
+
+def _diagonal_positions(A: sps.csr_matrix, rows: np.ndarray) -> np.ndarray:
+    """Find the position of diagonal elements in the data array of a csr matrix.
+
+    The matrix is assumed to be in canonical format, that is, without duplicate
+    entries.
+
+    Parameters:
+        A (sps.csr_matrix): Matrix.
+        rows (np.ndarray): Rows for which the diagonal elements are sought.
+
+    Returns:
+        np.ndarray: Index in A.data of the diagonal element of each of the rows.
+            Rows without a stored diagonal element are left out, thus the size of
+            the array is smaller than that of rows if not all diagonal elements are
+            present.
+
+    """
+    # All entries in the rows, and the row of each entry.
+    pos = mcolon(A.indptr[rows], A.indptr[rows + 1])
+    row_of_pos = np.repeat(rows, A.indptr[rows + 1] - A.indptr[rows])
+    return pos[A.indices[pos] == row_of_pos]
+
+
+def _add_to_diagonal(
+    A: sps.csr_matrix, rows: np.ndarray, values: np.ndarray
+) -> sps.csr_matrix:
+    """Add values to diagonal elements of a csr matrix.
+
+    The values are added directly to the data of the matrix, if all the diagonal
+    elements are present in its sparsity pattern. If not, a matrix which only holds
+    the values is added, and a new matrix is returned.
+
+    Parameters:
+        A (sps.csr_matrix): Matrix.
+        rows (np.ndarray): Rows of the diagonal elements to be modified.
+        values (np.ndarray): Values to be added, one per row.
+
+    Returns:
+        sps.csr_matrix: Matrix with the values added to the diagonal. This is A if
+            the values could be added in place.
+
+    """
+    A.sum_duplicates()
+    diag_pos = _diagonal_positions(A, rows)
+    if diag_pos.size == rows.size:
+        A.data[diag_pos] += values
+        return A
+    return A + sps.csr_matrix((values, (rows, rows)), shape=A.shape)
+
+
+@numba.njit(cache=True, nogil=True, boundscheck=False)
+def _clear_rows_set_diagonal_kernel(indptr, indices, data, rows, value):
+    """Clear the stored entries of a set of rows in a compressed sparse matrix, and
+    set the diagonal elements of the rows to a given value.
+
+    Returns the number of diagonal elements which were found, and thus set.
+
+    """
+    num_found = 0
+    for r in rows:
+        for k in range(indptr[r], indptr[r + 1]):
+            if indices[k] == r:
+                data[k] = value
+                num_found += 1
+            else:
+                data[k] = 0.0
+    return num_found
+
+
+def _clear_rows_set_diagonal(A: sps.spmatrix, rows: np.ndarray, value: float) -> None:
+    """Clear rows of a sparse matrix and put a given value on their diagonal, in place.
+
+    For a csc matrix, the columns are cleared instead. If some of the diagonal
+    elements are not in the sparsity pattern of the matrix, they are inserted.
+
+    Parameters:
+        A (sps.csr_matrix or sps.csc_matrix): Matrix to be modified.
+        rows (np.ndarray): Indices of the rows to be cleared.
+        value (float): Value to be put on the diagonal of the cleared rows.
+
+    """
+    # Duplicate entries would result in a multiple of value on the diagonal.
+    A.sum_duplicates()
+    num_found = _clear_rows_set_diagonal_kernel(
+        A.indptr, A.indices, A.data, rows, float(value)
+    )
+    if num_found < rows.size:
+        d = A.diagonal()
+        d[rows] = value
+        A.setdiag(d)
+
+
+@numba.njit(cache=True, nogil=True, fastmath={"contract"})
+def _inv_matrix_3d_sym_into(K, out, c):
+    """Explicit inversion of the symmetric matrix 3x3 K[:, :, c], written to
+    out[:, :, c].
+
+    Only the upper triangle of K is accessed. The expressions are sums of pairwise
+    products, which the compiler is allowed to contract into fused multiply-adds; no
+    other floating point reordering is permitted.
+
+    """
+    k00 = K[0, 0, c]
+    k01 = K[0, 1, c]
+    k02 = K[0, 2, c]
+    k11 = K[1, 1, c]
+    k12 = K[1, 2, c]
+    k22 = K[2, 2, c]
+
+    # Cofactors of the first row, reused in the determinant
+    c00 = k11 * k22 - k12 * k12
+    c01 = k02 * k12 - k01 * k22
+    c02 = k01 * k12 - k02 * k11
+    inv_det = 1.0 / (k00 * c00 + k01 * c01 + k02 * c02)
+
+    out[0, 0, c] = c00 * inv_det
+    out[0, 1, c] = c01 * inv_det
+    out[0, 2, c] = c02 * inv_det
+    out[1, 0, c] = out[0, 1, c]
+    out[1, 1, c] = (k00 * k22 - k02 * k02) * inv_det
+    out[1, 2, c] = (k02 * k01 - k00 * k12) * inv_det
+    out[2, 0, c] = out[0, 2, c]
+    out[2, 1, c] = out[1, 2, c]
+    out[2, 2, c] = (k00 * k11 - k01 * k01) * inv_det
+
+
+@numba.njit(cache=True, nogil=True, parallel=True, fastmath={"contract"})
+def _inv_matrix_3d_sym_batch(K, out):
+    """Explicit inversion of a stack of symmetric matrices 3x3, K[:, :, c] for all
+    c, written to out.
+
+    """
+    for c in numba.prange(K.shape[2]):
+        _inv_matrix_3d_sym_into(K, out, c)
 
 
 def project_flux(
@@ -39,15 +300,14 @@ def project_flux(
     """
 
     for sd, data in mdg.subdomains(return_data=True):
+        face_flux = data[pp.STATE][flux]
         # we need to recover the flux from the mortar variable before
         # the projection, only lower dimensional edges need to be considered.
-        edge_flux = np.zeros(data[pp.STATE][flux].size)
-        faces = sd.tags["fracture_faces"]
-        if np.any(faces):
+        if np.any(sd.tags["fracture_faces"]):
+            edge_flux = np.zeros(face_flux.size)
             # recover the sign of the flux, since the mortar is assumed
             # to point from the higher to the lower dimensional problem
-            _, indices = np.unique(sd.cell_faces.indices, return_index=True)
-            sign = sps.diags(sd.cell_faces.data[indices], 0)
+            sign = _face_sign(sd)
 
             for intf in mdg.subdomain_to_interfaces(sd):
                 # do not consider the contribution from the mortar grid when the latter is
@@ -59,15 +319,28 @@ def project_flux(
                 # project the mortar variable back to the higher dimensional
                 # problem
                 # edge_flux += sign * g_m.mortar_to_primary_int() * d_e[pp.STATE][mortar_key]
-                edge_flux += (
-                    sign
-                    * intf.primary_to_mortar_avg().T
-                    * data_intf[pp.STATE][mortar_key]
+                edge_flux += sign * (
+                    intf.primary_to_mortar_avg().T @ data_intf[pp.STATE][mortar_key]
                 )
+            face_flux = edge_flux + face_flux
 
-        data[pp.STATE][P0_flux] = discr.project_flux(
-            sd, edge_flux + data[pp.STATE][flux], data
-        )
+        data[pp.STATE][P0_flux] = discr.project_flux(sd, face_flux, data)
+
+
+def make_pressure_slice(sd: pp.Grid) -> slice:
+    """Get the slice of the pressure dofs in a solution of a dual discretization.
+
+    The velocity dofs, one per face, are placed before the pressure dofs, one per
+    cell.
+
+    Parameters:
+        sd (pp.Grid): Grid.
+
+    Returns:
+        slice: Slice of the pressure dofs, to be used in DualElliptic.extract_pressure.
+
+    """
+    return slice(sd.num_faces, None)
 
 
 class DualElliptic(EllipticDiscretization):
@@ -92,6 +365,8 @@ class DualElliptic(EllipticDiscretization):
         self.div_matrix_key = "div"
         # Discretization of flux reconstruction
         self.vector_proj_key = "vector_proj"
+        # Transpose of the flux reconstruction, used for vector source terms
+        self.vector_proj_transposed_key = "vector_proj_T"
         # Discretization of vector source terms (gravity)
         self.vector_source_key = "vector_source"
 
@@ -150,57 +425,53 @@ class DualElliptic(EllipticDiscretization):
 
         mass = matrix_dictionary[self.mass_matrix_key]
         div = matrix_dictionary[self.div_matrix_key]
-        return sps.bmat([[mass, div.T], [div, None]], format="csr")
+        M = sps.bmat([[mass, div.T], [div, None]], format="csr")
+        # Bring the matrix to canonical format, with sorted indices and no duplicates,
+        # so that the in-place imposition of boundary conditions need not redo it.
+        # This is a no-op if the conversion to csr already did so.
+        M.sum_duplicates()
+        return M
 
     def assemble_neumann_robin(
         self, sd: pp.Grid, data: dict, M, bc_weight: bool = False
-    ) -> tuple[sps.csr_matrix, int]:
+    ) -> tuple[sps.csr_matrix, float]:
         """Impose Neumann and Robin boundary discretization on an already assembled
         system matrix.
         """
-        # Obtain the mass matrix
-        matrix_dictionary = data[pp.DISCRETIZATION_MATRICES][self.keyword]
-
-        mass = matrix_dictionary[self.mass_matrix_key]
-        if mass.shape[0] == 0:
-            norm = 1
-        else:
-            if bc_weight:
-                norm = sps.linalg.norm(mass, np.inf)
-            else:
-                norm = 1
-
         bc = data[pp.PARAMETERS][self.keyword]["bc"]
 
         # For mixed discretizations, internal boundaries
         # are handled by assigning Dirichlet conditions. Thus, we remove them
         # from the is_neu and is_rob (where they belong by default) and add them in
         # is_dir.
+        not_internal = ~bc.is_internal
+        is_neu = bc.is_neu & not_internal
+        is_rob = bc.is_rob & not_internal
+
+        # The norm of the mass matrix is only used to scale the Neumann conditions,
+        # and is therefore not computed if there are none.
+        norm = 1.0
+        if bc_weight and np.any(is_neu):
+            matrix_dictionary = data[pp.DISCRETIZATION_MATRICES][self.keyword]
+            norm = _inf_norm(matrix_dictionary[self.mass_matrix_key])
 
         # assign the Neumann boundary conditions
-        is_neu = np.logical_and(bc.is_neu, np.logical_not(bc.is_internal))
         if bc and np.any(is_neu):
             # it is assumed that the faces dof are put before the cell dof
             is_neu = np.where(is_neu)[0]
 
             # set in an efficient way the essential boundary conditions, by
             # clear the rows and put norm in the diagonal
-            for row in is_neu:
-                M.data[M.indptr[row] : M.indptr[row + 1]] = 0.0
-
-            d = M.diagonal()
-            d[is_neu] = norm
-            M.setdiag(d)
+            _clear_rows_set_diagonal(M, is_neu, norm)
 
         # assign the Robin boundary conditions
-        is_rob = np.logical_and(bc.is_rob, np.logical_not(bc.is_internal))
         if bc and np.any(is_rob):
             # it is assumed that the faces dof are put before the cell dof
             is_rob = np.where(is_rob)[0]
 
-            rob_val = np.zeros(self.ndof(sd))
-            rob_val[is_rob] = 1.0 / (bc.robin_weight[is_rob] * sd.face_areas[is_rob])
-            M += sps.dia_matrix((rob_val, 0), shape=(rob_val.size, rob_val.size))
+            rob_val = 1.0 / (bc.robin_weight[is_rob] * sd.face_areas[is_rob])
+
+            M = _add_to_diagonal(M, is_rob, rob_val)
 
         return M, norm
 
@@ -243,8 +514,12 @@ class DualElliptic(EllipticDiscretization):
         vector_source = parameter_dictionary.get(
             "vector_source", np.zeros(proj.shape[0])
         )
-        # Discretization of the vector source term
-        rhs[: sd.num_faces] += proj.T * vector_source
+        # Discretization of the vector source term. The transposed projection is
+        # stored by the discretization, if not, it is formed here.
+        proj_T = matrix_dictionary.get(self.vector_proj_transposed_key)
+        if proj_T is None:
+            proj_T = proj.T
+        rhs[: sd.num_faces] += proj_T @ vector_source
 
         if bc is None:
             return rhs
@@ -255,16 +530,16 @@ class DualElliptic(EllipticDiscretization):
         # values are simply added to the rhs, and the internal Dirichlet
         # conditions on the fractures SHOULD be homogeneous, we exclude them
         # from the dirichlet condition as well.
-        is_neu = np.logical_and(bc.is_neu, np.logical_not(bc.is_internal))
-        is_dir = np.logical_and(bc.is_dir, np.logical_not(bc.is_internal))
-        is_rob = np.logical_and(bc.is_rob, np.logical_not(bc.is_internal))
+        not_internal = ~bc.is_internal
+        is_neu = bc.is_neu & not_internal
+        is_dir = bc.is_dir & not_internal
+        is_rob = bc.is_rob & not_internal
         if hasattr(sd, "periodic_face_map"):
             raise NotImplementedError(
                 "Periodic boundary conditions are not implemented for DualElliptic"
             )
 
-        faces, _, sign = sps.find(sd.cell_faces)
-        sign = sign[np.unique(faces, return_index=True)[1]]
+        sign = _face_sign(sd)
 
         if np.any(is_dir):
             is_dir = np.where(is_dir)[0]
@@ -323,7 +598,7 @@ class DualElliptic(EllipticDiscretization):
         M: sps.csr_matrix,
         mass: sps.csr_matrix,
         bc_weight: Optional[float] = None,
-    ) -> tuple[sps.csr_matrix, np.ndarray]:
+    ) -> tuple[sps.csr_matrix, float]:
         """Impose Neumann boundary discretization on an already assembled
         system matrix.
 
@@ -332,8 +607,6 @@ class DualElliptic(EllipticDiscretization):
 
         """
 
-        norm = sps.linalg.norm(mass, np.inf) if bc_weight else 1
-
         parameter_dictionary = data[pp.PARAMETERS][self.keyword]
         bc = parameter_dictionary["bc"]
 
@@ -342,39 +615,55 @@ class DualElliptic(EllipticDiscretization):
         # are handled by assigning Dirichlet conditions. THus, we remove them
         # from the is_neu (where they belong by default) and add them in
         # is_dir.
-        is_neu = np.logical_and(bc.is_neu, np.logical_not(bc.is_internal))
+        is_neu = bc.is_neu & ~bc.is_internal
+
+        # The norm is only needed if there are Neumann conditions to scale.
+        norm = _inf_norm(mass) if bc_weight and np.any(is_neu) else 1.0
+
         if bc and np.any(is_neu):
             is_neu = np.hstack((is_neu, np.zeros(sd.num_cells, dtype=bool)))
             is_neu = np.where(is_neu)[0]
 
             # set in an efficient way the essential boundary conditions, by
             # clear the rows and put norm in the diagonal
-            for row in is_neu:
-                M.data[M.indptr[row] : M.indptr[row + 1]] = 0.0
-
-            d = M.diagonal()
-            d[is_neu] = norm
-            M.setdiag(d)
+            _clear_rows_set_diagonal(M, is_neu, norm)
 
         return M, norm
 
     @staticmethod
     def _velocity_dof(
-        sd: pp.Grid, intf: pp.MortarGrid, hat_E_int: sps.csc_matrix
+        sd: pp.Grid,
+        intf: pp.MortarGrid,
+        hat_E_int: sps.csc_matrix,
+        use_secondary_proj: bool = False,
     ) -> sps.csr_matrix:
-        # Recover the information for the grid-grid mapping
-        faces_h, cells_h, sign_h = sps.find(sd.cell_faces)
-        ind_faces_h = np.unique(faces_h, return_index=True)[1]
-        cells_h = cells_h[ind_faces_h]
-        sign_h = sign_h[ind_faces_h]
-
-        # Velocity degree of freedom matrix
-        U = sps.diags(sign_h)
-
-        shape = (sd.num_cells, intf.num_cells)
-
-        hat_E_int = sps.bmat([[U * hat_E_int], [sps.csr_matrix(shape)]])
-        return hat_E_int
+        # The result only depends on the projection matrix, which is stored in the
+        # mortar grid, and the topology of the grid. It is therefore cached on the
+        # mortar grid, with one entry for each side of the interface and each grid
+        # it is called with. The entry is replaced if the projection or the topology
+        # changes, so that outdated matrices are not kept alive. The cached matrix
+        # should not be modified by the caller.
+        cache = getattr(intf, "_velocity_dof_cache", None)
+        if cache is None:
+            cache = {}
+            intf._velocity_dof_cache = cache  # type: ignore[attr-defined]
+        key = (use_secondary_proj, id(sd))
+        entry = cache.get(key)
+        if entry is not None and entry[0] is hat_E_int and entry[1] is sd.cell_faces:
+            return entry[2]
+
+        # Scale the rows of the projection by the sign of the faces. This is
+        # equivalent to a left multiplication by the diagonal matrix of face signs.
+        # Copy, so that the projection matrix stored in the mortar grid is untouched.
+        proj = hat_E_int
+        hat_E_int = hat_E_int.tocsr(copy=True)
+        hat_E_int.data *= np.repeat(_face_sign(sd), np.diff(hat_E_int.indptr))
+
+        # The velocity degrees of freedom are followed by the cell dofs, which are
+        # not affected by the projection.
+        velocity_dof = _append_zero_rows(hat_E_int, sd.num_cells)
+        cache[key] = (proj, sd.cell_faces, velocity_dof)
+        return velocity_dof
 
     def assemble_int_bound_flux(
         self,
@@ -419,14 +708,7 @@ class DualElliptic(EllipticDiscretization):
                 used. Needed for periodic boundary conditions.
 
         """
-        msg = """This function is deprecated and will be removed, most likely in the
-        second half of 2022.
-
-        To assemble mixed-dimensional elliptic problems, the recommended solution is
-        either to use the models, or to use the automatic differentiation framework
-        directly.
-        """
-        warn(msg, DeprecationWarning, stacklevel=2)
+        _warn_deprecated("assemble_int_bound_flux")
 
         # The matrix must be the VEM discretization matrix.
         if use_secondary_proj:
@@ -434,7 +716,7 @@ class DualElliptic(EllipticDiscretization):
         else:
             proj = intf.mortar_to_primary_int()
 
-        hat_E_int = self._velocity_dof(sd, intf, proj)
+        hat_E_int = self._velocity_dof(sd, intf, proj, use_secondary_proj)
         cc[self_ind, 2] += matrix[self_ind, self_ind] * hat_E_int
 
     def assemble_int_bound_source(
@@ -477,19 +759,11 @@ class DualElliptic(EllipticDiscretization):
                 Should be either 1 or 2.
 
         """
-        msg = """This function is deprecated and will be removed, most likely in the
-        second half of 2022.
-
-        To assemble mixed-dimensional elliptic problems, the recommended solution is
-        either to use the models, or to use the automatic differentiation framework
-        directly.
-        """
-        warn(msg, DeprecationWarning, stacklevel=2)
+        _warn_deprecated("assemble_int_bound_source")
         proj = intf.secondary_to_mortar_avg()
 
-        A = proj.T
-        shape = (sd.num_faces, A.shape[1])
-        cc[self_ind, 2] += sps.bmat([[sps.csr_matrix(shape)], [A]])
+        # The face dofs are placed before the cell dofs.
+        cc[self_ind, 2] += _prepend_zero_rows(proj.T.tocsr(), sd.num_faces)
 
     def assemble_int_bound_pressure_trace(
         self,
@@ -536,26 +810,22 @@ class DualElliptic(EllipticDiscretization):
                 used. Needed for periodic boundary conditions.
 
         """
-        msg = """This function is deprecated and will be removed, most likely in the
-        second half of 2022.
-
-        To assemble mixed-dimensional elliptic problems, the recommended solution is
-        either to use the models, or to use the automatic differentiation framework
-        directly.
-        """
-        warn(msg, DeprecationWarning, stacklevel=2)
+        _warn_deprecated("assemble_int_bound_pressure_trace")
 
         if use_secondary_proj:
             proj = intf.mortar_to_secondary_int()
         else:
             proj = intf.mortar_to_primary_int()
 
-        hat_E_int = self._velocity_dof(sd, intf, proj)
+        hat_E_int = self._velocity_dof(sd, intf, proj, use_secondary_proj)
 
         assert cc is not None
 
-        cc[2, self_ind] -= hat_E_int.T * matrix[self_ind, self_ind]
-        cc[2, 2] -= hat_E_int.T * matrix[self_ind, self_ind] * hat_E_int
+        # The product of the transposed projection and the discretization matrix
+        # enters both blocks, compute it once.
+        E_T_A = hat_E_int.T.tocsr() @ matrix[self_ind, self_ind]
+        cc[2, self_ind] -= E_T_A
+        cc[2, 2] -= E_T_A @ hat_E_int
 
     def assemble_int_bound_pressure_trace_rhs(
         self, sd, data, data_edge, cc, rhs, self_ind, use_secondary_proj=False
@@ -666,21 +936,12 @@ class DualElliptic(EllipticDiscretization):
                 Should be either 1 or 2.
 
         """
-        msg = """This function is deprecated and will be removed, most likely in the
-        second half of 2022.
-
-        To assemble mixed-dimensional elliptic problems, the recommended solution is
-        either to use the models, or to use the automatic differentiation framework
-        directly.
-        """
-        warn(msg, DeprecationWarning, stacklevel=2)
+        _warn_deprecated("assemble_int_bound_pressure_cell")
 
         proj = intf.secondary_to_mortar_avg()
 
-        A = proj.T
-        shape = (sd.num_faces, A.shape[1])
-
-        cc[2, self_ind] -= sps.bmat([[sps.csr_matrix(shape)], [A]]).T
+        # The face dofs are placed before the cell dofs.
+        cc[2, self_ind] -= _prepend_zero_rows(proj.T.tocsr(), sd.num_faces).T
 
     def enforce_neumann_int_bound(
         self,
@@ -706,21 +967,18 @@ class DualElliptic(EllipticDiscretization):
         """
         hat_E_int = self._velocity_dof(sd, intf, intf.mortar_to_primary_int())
 
-        dof = np.where(hat_E_int.sum(axis=1).A.astype(bool))[0]
-        norm = np.linalg.norm(matrix[self_ind, self_ind].diagonal(), np.inf)
-
-        for row in dof:
-            matrix_indptr = matrix[self_ind, self_ind].indptr
-            idx = slice(matrix_indptr[row], matrix_indptr[row + 1])
-            matrix[self_ind, self_ind].data[idx] = 0.0
+        # The dofs are the rows with entries in the projection. The face signs do not
+        # cancel any entries, thus the rows can be identified from the csr structure.
+        dof = np.where(np.diff(hat_E_int.indptr) > 0)[0]
+        norm = float(np.linalg.norm(matrix[self_ind, self_ind].diagonal(), np.inf))
 
-            matrix_indptr = matrix[self_ind, 2].indptr
-            idx = slice(matrix_indptr[row], matrix_indptr[row + 1])
-            matrix[self_ind, 2].data[idx] = 0.0
-
-        d = matrix[self_ind, self_ind].diagonal()
-        d[dof] = norm
-        matrix[self_ind, self_ind].setdiag(d)
+        # Clear the entries of the constrained dofs in both blocks, and put norm on
+        # the diagonal of the diagonal block. All entries are found directly from the
+        # compressed storage of each block.
+        A = matrix[self_ind, self_ind]
+        B = matrix[self_ind, 2]
+        B.data[mcolon(B.indptr[dof], B.indptr[dof + 1])] = 0.0
+        _clear_rows_set_diagonal(A, dof, norm)
 
     def extract_flux(
         self, sd: pp.Grid, solution_array: np.ndarray, data: dict
@@ -745,7 +1003,11 @@ class DualElliptic(EllipticDiscretization):
         return solution_array[: sd.num_faces]
 
     def extract_pressure(
-        self, sd: pp.Grid, solution_array: np.ndarray, data: dict
+        self,
+        sd: pp.Grid,
+        solution_array: np.ndarray,
+        data: dict,
+        pressure_slice: Optional[slice] = None,
     ) -> np.ndarray:
         """Extract the pressure from a dual virtual element solution.
 
@@ -756,6 +1018,10 @@ class DualElliptic(EllipticDiscretization):
             Solution, stored as [velocity,pressure]
         data: data dictionary associated with the grid.
             Unused, but included for consistency reasons.
+        pressure_slice : slice, optional
+            Slice of the pressure dofs in the solution, as given by
+            make_pressure_slice. Can be passed by callers which extract the pressure
+            repeatedly; if not provided, it is computed from the grid.
 
         Return
         ------
@@ -764,12 +1030,55 @@ class DualElliptic(EllipticDiscretization):
 
         """
         # pylint: disable=invalid-name
-        return solution_array[sd.num_faces :]
+        if pressure_slice is None:
+            pressure_slice = make_pressure_slice(sd)
+        return solution_array[pressure_slice]
+
+    @staticmethod
+    def _inv_permeability(
+        sd: pp.Grid, K: np.ndarray, matrix_dictionary: Optional[dict] = None
+    ) -> np.ndarray:
+        """Explicit inversion of the permeability tensors of all the cells of a grid.
+
+        If a matrix dictionary is given, the result is written to a buffer stored in
+        it, which is reused by later discretizations with the same keyword. The
+        returned array is this buffer, and is thus overwritten by the next
+        discretization; it should not be kept beyond the discretization it is
+        computed for.
+
+        Parameters
+        ----------
+        sd : grid
+        K : the tensors to be inverted, sd.dim x sd.dim x sd.num_cells
+        matrix_dictionary : discretization matrices of the keyword, optional
+
+        Return
+        ------
+        The inverted tensors sd.dim x sd.dim x sd.num_cells
+        """
+        shape = (sd.dim, sd.dim, sd.num_cells)
+        out = None
+        if matrix_dictionary is not None:
+            out = matrix_dictionary.get("_inv_permeability")
+        if out is None or out.shape != shape:
+            out = np.empty(shape)
+            if matrix_dictionary is not None:
+                matrix_dictionary["_inv_permeability"] = out
+
+        if sd.dim == 1:
+            return DualElliptic._inv_matrix_1d_batch(K, out)
+        elif sd.dim == 2:
+            return DualElliptic._inv_matrix_2d_batch(K, out)
+        else:
+            return DualElliptic._inv_matrix_3d_batch(K, out)
 
     @staticmethod
     def _inv_matrix_1d(K: np.ndarray) -> np.ndarray:
         """Explicit inversion of a matrix 1x1.
 
+        Thin wrapper around the batched version, kept for callers which invert a
+        single matrix.
+
         Parameters
         ----------
         K : the matrix to be inverted 1x1
@@ -778,12 +1087,36 @@ class DualElliptic(EllipticDiscretization):
         ------
         The inverted matrix 1x1
         """
-        return np.array([[1.0 / K[0, 0]]])
+        K = np.asarray(K, dtype=float)[:, :, np.newaxis]
+        return DualElliptic._inv_matrix_1d_batch(K)[:, :, 0]
+
+    @staticmethod
+    def _inv_matrix_1d_batch(
+        K: np.ndarray, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Explicit inversion of a stack of matrices 1x1.
+
+        Parameters
+        ----------
+        K : the matrices to be inverted 1x1xn, one matrix per cell
+        out : array 1x1xn to store the result in, optional
+
+        Return
+        ------
+        The inverted matrices 1x1xn
+        """
+        if out is None:
+            out = np.empty((1, 1, K.shape[2]))
+        np.reciprocal(K[0, 0], out=out[0, 0], dtype=float)
+        return out
 
     @staticmethod
     def _inv_matrix_2d(K: np.ndarray) -> np.ndarray:
         """Explicit inversion of a symmetric matrix 2x2.
 
+        Thin wrapper around the batched version, kept for callers which invert a
+        single matrix.
+
         Parameters
         ----------
         K : the matrix to be inverted 2x2
@@ -792,13 +1125,39 @@ class DualElliptic(EllipticDiscretization):
         ------
         The inverted matrix 2x2
         """
+        K = np.asarray(K, dtype=float)[:, :, np.newaxis]
+        return DualElliptic._inv_matrix_2d_batch(K)[:, :, 0]
+
+    @staticmethod
+    def _inv_matrix_2d_batch(
+        K: np.ndarray, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Explicit inversion of a stack of symmetric matrices 2x2.
+
+        Parameters
+        ----------
+        K : the matrices to be inverted 2x2xn, one matrix per cell
+        out : array 2x2xn to store the result in, optional
+
+        Return
+        ------
+        The inverted matrices 2x2xn
+        """
         det = K[0, 0] * K[1, 1] - K[0, 1] * K[0, 1]
-        return np.array([[K[1, 1], -K[0, 1]], [-K[0, 1], K[0, 0]]]) / det
+        inv_K = np.empty((2, 2, K.shape[2])) if out is None else out
+        inv_K[0, 0] = K[1, 1] / det
+        inv_K[0, 1] = -K[0, 1] / det
+        inv_K[1, 0] = inv_K[0, 1]
+        inv_K[1, 1] = K[0, 0] / det
+        return inv_K
 
     @staticmethod
     def _inv_matrix_3d(K: np.ndarray) -> np.ndarray:
         """Explicit inversion of a symmetric matrix 3x3.
 
+        Thin wrapper around the batched version, kept for callers which invert a
+        single matrix.
+
         Parameters
         ----------
         K : the matrix to be inverted 3x3
@@ -807,33 +1166,24 @@ class DualElliptic(EllipticDiscretization):
         ------
         The inverted matrix 3x3
         """
+        K = np.asarray(K, dtype=float)[:, :, np.newaxis]
+        return DualElliptic._inv_matrix_3d_batch(K)[:, :, 0]
 
-        det = (
-            K[0, 0] * K[1, 1] * K[2, 2]
-            - K[0, 0] * K[1, 2] * K[1, 2]
-            - K[0, 1] * K[0, 1] * K[2, 2]
-            + 2 * K[0, 1] * K[0, 2] * K[1, 2]
-            - K[0, 2] * K[0, 2] * K[1, 1]
-        )
-        return (
-            np.array(
-                [
-                    [
-                        K[1, 1] * K[2, 2] - K[1, 2] * K[1, 2],
-                        K[0, 2] * K[1, 2] - K[0, 1] * K[2, 2],
-                        K[0, 1] * K[1, 2] - K[0, 2] * K[1, 1],
-                    ],
-                    [
-                        K[0, 2] * K[1, 2] - K[0, 1] * K[2, 2],
-                        K[0, 0] * K[2, 2] - K[0, 2] * K[0, 2],
-                        K[0, 2] * K[1, 0] - K[0, 0] * K[1, 2],
-                    ],
-                    [
-                        K[0, 1] * K[1, 2] - K[0, 2] * K[1, 1],
-                        K[0, 1] * K[0, 2] - K[0, 0] * K[1, 2],
-                        K[0, 0] * K[1, 1] - K[0, 1] * K[0, 1],
-                    ],
-                ]
-            )
-            / det
-        )
+    @staticmethod
+    def _inv_matrix_3d_batch(
+        K: np.ndarray, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Explicit inversion of a stack of symmetric matrices 3x3.
+
+        Parameters
+        ----------
+        K : the matrices to be inverted 3x3xn, one matrix per cell
+        out : array 3x3xn to store the result in, optional
+
+        Return
+        ------
+        The inverted matrices 3x3xn
+        """
+        inv_K = np.empty((3, 3, K.shape[2])) if out is None else out
+        _inv_matrix_3d_sym_batch(K.astype(float, copy=False), inv_K)
+        return inv_K
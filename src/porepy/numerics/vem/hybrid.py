@@ -99,6 +99,9 @@ class HybridDualVEM:
         bc = parameter_dictionary["bc"]
         bc_val = parameter_dictionary["bc_values"]
         a = parameter_dictionary["aperture"]
+        matrix_dictionary = pp.params.data.add_discretization_matrix_keyword(
+            data, self.keyword
+        )
 
         faces, _, sgn = sps.find(g.cell_faces)
 
@@ -122,13 +125,10 @@ class HybridDualVEM:
         # Use a dummy keyword to trick the constructor of dualVEM.
         massHdiv = pp.MVEM("dummy").massHdiv
 
-        # define the function to compute the inverse of the permeability matrix
-        if g.dim == 1:
-            inv_matrix = DualElliptic._inv_matrix_1d
-        elif g.dim == 2:
-            inv_matrix = DualElliptic._inv_matrix_2d
-        elif g.dim == 3:
-            inv_matrix = DualElliptic._inv_matrix_3d
+        # compute the inverse of the permeability matrix for all the cells at once
+        inv_k = DualElliptic._inv_permeability(
+            g, k.values[0 : g.dim, 0 : g.dim, :], matrix_dictionary
+        )
 
         for c in np.arange(g.num_cells):
             # For the current cell retrieve its faces
@@ -145,7 +145,7 @@ class HybridDualVEM:
             # Compute the H_div-mass local matrix
             A = massHdiv(
                 k.values[0 : g.dim, 0 : g.dim, c],
-                inv_matrix(k.values[0 : g.dim, 0 : g.dim, c]),
+                inv_k[:, :, c],
                 c_centers[:, c],
                 a[c] * g.cell_volumes[c],
                 f_centers[:, faces_loc],
@@ -115,13 +115,10 @@ class MVEM(DualElliptic):
         idx_P = 0
         idx_row_P = 0
 
-        # define the function to compute the inverse of the permeability matrix
-        if sd.dim == 1:
-            inv_matrix = self._inv_matrix_1d
-        elif sd.dim == 2:
-            inv_matrix = self._inv_matrix_2d
-        elif sd.dim == 3:
-            inv_matrix = self._inv_matrix_3d
+        # compute the inverse of the permeability matrix for all the cells at once
+        inv_k = self._inv_permeability(
+            sd, k.values[0 : sd.dim, 0 : sd.dim, :], matrix_dictionary
+        )
 
         for c in np.arange(sd.num_cells):
             # For the current cell retrieve its faces
@@ -131,7 +128,7 @@ class MVEM(DualElliptic):
             # Compute the H_div-mass local matrix
             A = self.massHdiv(
                 k.values[0 : sd.dim, 0 : sd.dim, c],
-                inv_matrix(k.values[0 : sd.dim, 0 : sd.dim, c]),
+                inv_k[:, :, c],
                 c_centers[:, c],
                 sd.cell_volumes[c],
                 f_centers[:, faces_loc],
@@ -172,13 +169,16 @@ class MVEM(DualElliptic):
             idx_row_P += 3
 
         # Construct the global matrices
-        mass = sps.coo_matrix((data_A, (rows_A, cols_A)))
+        # The conversion sums the duplicate entries, thus the mass matrix is stored in
+        # canonical csr format.
+        mass = sps.coo_matrix((data_A, (rows_A, cols_A))).tocsr()
         div = -sd.cell_faces.T
         proj = sps.coo_matrix((data_P, (rows_P, cols_P)))
 
         matrix_dictionary[self.mass_matrix_key] = mass
         matrix_dictionary[self.div_matrix_key] = div
         matrix_dictionary[self.vector_proj_key] = proj
+        matrix_dictionary[self.vector_proj_transposed_key] = proj.T.tocsr()
 
     @staticmethod
     def massHdiv(
@@ -65,16 +65,24 @@ data[pp.STATE][keyword]["bc_values"].
 from __future__ import annotations
 
 import numbers
+import sys
 import warnings
-from typing import Dict, Optional, Union
+from functools import lru_cache
+from typing import Optional, Union
 
 import numpy as np
 
 import porepy as pp
 import porepy.params.parameter_dictionaries as dicts
+from porepy.utils.common_constants import (
+    DISCRETIZATION_MATRICES,
+    ITERATE,
+    PARAMETERS,
+    STATE,
+)
 
 
-class Parameters(Dict):
+class Parameters(dict):
     """Class to store all physical parameters used by solvers.
 
     The intention is to provide a unified way of passing around parameters, and
@@ -104,12 +112,12 @@ class Parameters(Dict):
             dictionaries (list of dictionaries, optional): List of dictionaries with
                 specified parameters, one for each keyword in keywords.
         """
+        self.grid = grid
         if not keywords:
             keywords = []
         if not dictionaries:
             dictionaries = []
         self.update_dictionaries(keywords, dictionaries)
-        self.grid = grid
 
     def __repr__(self):
         s = "Data object for physical processes "
@@ -182,10 +190,11 @@ class Parameters(Dict):
             parameters (list[str]): List of (existing) parameters to be overwritten.
             values (list): List of new values (bool, scalars, arrays etc.).
         """
-        for kw in self.keys():
-            for (p, v) in zip(parameters, values):
-                if p in self[kw]:
-                    self[kw][p] = v
+        new_values = dict(zip(parameters, values))
+        for param_dict in self.values():
+            # Only the parameters present for this keyword are overwritten.
+            for p in new_values.keys() & param_dict.keys():
+                param_dict[p] = new_values[p]
 
     def modify_parameters(
         self, keyword: str, parameters: list[str], values: list
@@ -202,8 +211,9 @@ class Parameters(Dict):
                 in particular that the type and length of the new and old values agree,
                 see modify_variable.
         """
+        param_dict = self[keyword]
         for (p, v) in zip(parameters, values):
-            modify_variable(self[keyword][p], v)
+            modify_variable(param_dict[p], v)
 
     def expand_scalars(
         self,
@@ -234,7 +244,17 @@ class Parameters(Dict):
                 val = self[keyword].get(p)
             else:
                 val = self[keyword].get(p, d)
-            if np.asarray(val).size == 1:
+            # Arrays, the common case, and numbers are identified without conversion
+            # of the value to an array.
+            if isinstance(val, np.ndarray):
+                if val.size == 1 and val.shape != (n_vals,):
+                    # A single value wrapped in an array is expanded as a scalar.
+                    val = val.item()
+            if isinstance(val, numbers.Number):
+                # Fill directly, with the same dtype as multiplication by a float
+                # array would give.
+                val = np.full(n_vals, val, dtype=np.result_type(type(val), float))
+            elif not isinstance(val, np.ndarray) and np.asarray(val).size == 1:
                 val *= np.ones(n_vals)
             values.append(val)
         return values
@@ -246,6 +266,13 @@ TODO: Improve/add/remove methods based on experience with setting up problems us
 new Parameters class.
 """
 
+# Functions providing default parameters for each of the parameter types.
+_default_dictionaries = {
+    "flow": dicts.flow_dictionary,
+    "transport": dicts.transport_dictionary,
+    "mechanics": dicts.mechanics_dictionary,
+}
+
 
 def initialize_default_data(
     grid: Union[pp.Grid, pp.MortarGrid],
@@ -281,19 +308,16 @@ def initialize_default_data(
         specified_parameters = {}
     if not keyword:
         keyword = parameter_type
-    if parameter_type == "flow":
-        d = dicts.flow_dictionary(grid, specified_parameters)
-    elif parameter_type == "transport":
-        d = dicts.transport_dictionary(grid, specified_parameters)
-    elif parameter_type == "mechanics":
-        d = dicts.mechanics_dictionary(grid, specified_parameters)
-    else:
+    try:
+        default_dictionary = _default_dictionaries[parameter_type]
+    except KeyError:
         raise KeyError(
             'Default dictionaries only exist for the parameter types "flow", '
             + '"transport" and "mechanics", not for '
             + parameter_type
             + "."
-        )
+        ) from None
+    d = default_dictionary(grid, specified_parameters)
     return initialize_data(grid, data, keyword, d)
 
 
@@ -322,10 +346,10 @@ def initialize_data(
     if not specified_parameters:
         specified_parameters = {}
     add_discretization_matrix_keyword(data, keyword)
-    if pp.PARAMETERS in data:
-        data[pp.PARAMETERS].update_dictionaries([keyword], [specified_parameters])
+    if PARAMETERS in data:
+        data[PARAMETERS].update_dictionaries([keyword], [specified_parameters])
     else:
-        data[pp.PARAMETERS] = pp.Parameters(grid, [keyword], [specified_parameters])
+        data[PARAMETERS] = pp.Parameters(grid, [keyword], [specified_parameters])
     return data
 
 
@@ -345,10 +369,10 @@ def set_state(data: dict, state: Optional[dict] = None) -> dict:
         dict: The filled dictionary.
     """
     state = state or {}
-    if pp.STATE in data:
-        data[pp.STATE].update(state)
+    if STATE in data:
+        data[STATE].update(state)
     else:
-        data[pp.STATE] = state
+        data[STATE] = state
     return data
 
 
@@ -366,16 +390,32 @@ def set_iterate(data: dict, iterate: Optional[dict] = None) -> dict:
     Returns:
         dict: The filled dictionary.
     """
-    if pp.STATE not in data:
+    if STATE not in data:
         set_state(data)
     iterate = iterate or {}
-    if pp.ITERATE in data[pp.STATE]:
-        data[pp.STATE][pp.ITERATE].update(iterate)
+    if ITERATE in data[STATE]:
+        data[STATE][ITERATE].update(iterate)
     else:
-        data[pp.STATE][pp.ITERATE] = iterate
+        data[STATE][ITERATE] = iterate
     return data
 
 
+@lru_cache(maxsize=None)
+def _warn_dtype_mismatch(filename: str, lineno: int, module: str) -> None:
+    """Warn that an array is modified with values of a different dtype.
+
+    The warning is attributed to the given location, that is, the caller of
+    modify_variable, and is issued only the first time for each location.
+    """
+    warnings.warn_explicit(
+        "Modifying array: new and old values have different dtypes.",
+        UserWarning,
+        filename,
+        lineno,
+        module=module,
+    )
+
+
 def modify_variable(variable, new_value) -> None:
     """Changes the value (not id) of the stored parameter.
 
@@ -384,7 +424,7 @@ def modify_variable(variable, new_value) -> None:
     Note that there are implicit assumptions on the arguments, in particular that
     the new value is of the same type as the variable. Further, if variable is a
         list, the lists should have the same length
-        np.ndarray, the arrays should have the same shape, and new_value must be
+        np.ndarray, new_value must be broadcastable to the shape of the variable, and
             convertible to variable.dtype
 
     Args:
@@ -396,9 +436,17 @@ def modify_variable(variable, new_value) -> None:
         NotImplementedError if a variable of unknown type is passed.
     """
     if isinstance(variable, np.ndarray):
+        new_value = np.asarray(new_value)
         if variable.dtype != new_value.dtype:
-            warnings.warn("Modifying array: new and old values have different dtypes.")
-        variable.setfield(new_value, variable.dtype)
+            caller = sys._getframe(1)
+            _warn_dtype_mismatch(
+                caller.f_code.co_filename,
+                caller.f_lineno,
+                caller.f_globals.get("__name__", ""),
+            )
+        # The new values are cast to the dtype of the variable, and broadcast to its
+        # shape if need be.
+        np.copyto(variable, new_value, casting="unsafe")
     elif isinstance(variable, list):
         variable[:] = new_value
     elif isinstance(variable, pp.SecondOrderTensor):
@@ -418,8 +466,7 @@ def add_nonpresent_dictionary(dictionary: dict, key: str) -> None:
         dictionary (dict): Dictionary to be updated.
         key (str): Keyword to be added to the dictionary if missing.
     """
-    if key not in dictionary:
-        dictionary[key] = {}
+    dictionary.setdefault(key, {})
 
 
 def add_discretization_matrix_keyword(dictionary: dict, keyword: str) -> dict:
@@ -437,6 +484,4 @@ def add_discretization_matrix_keyword(dictionary: dict, keyword: str) -> dict:
     Returns:
         dict: Matrix dictionary of discretization matrices.
     """
-    add_nonpresent_dictionary(dictionary, pp.DISCRETIZATION_MATRICES)
-    add_nonpresent_dictionary(dictionary[pp.DISCRETIZATION_MATRICES], keyword)
-    return dictionary[pp.DISCRETIZATION_MATRICES][keyword]
+    return dictionary.setdefault(DISCRETIZATION_MATRICES, {}).setdefault(keyword, {})
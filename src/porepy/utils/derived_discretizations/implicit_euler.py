@@ -6,6 +6,10 @@ See the parent discretizations for further documentation.
 """
 from __future__ import annotations
 
+import numbers
+from functools import lru_cache
+
+import numba
 import numpy as np
 import scipy.sparse as sps
 
@@ -40,17 +44,99 @@ class ImplicitMassMatrix(pp.MassMatrix):
         return matrix_dictionary["mass"] * previous_solution
 
 
-class ImplicitMpfa(pp.Mpfa):
+def _cell_faces_transposed(sd: pp.Grid) -> sps.csr_matrix:
+    """Return the transpose of the cell-face relation of a grid in csr format.
+
+    The result is cached on the grid, and recomputed if the cell-face relation is
+    replaced.
+
+    Parameters:
+        sd (pp.Grid): Grid.
+
+    Returns:
+        sps.csr_matrix (sd.num_cells x sd.num_faces): Transposed cell-face relation.
+
+    """
+    return pp.grid_utils.cached_on_grid(
+        sd, "cell_faces_transposed", lambda: sd.cell_faces.T.tocsr()
+    )
+
+
+def _assembled_flux_matrix(
+    discr: pp.FVElliptic, sd: pp.Grid, sd_data: dict
+) -> sps.spmatrix:
+    """Return the system matrix of a finite volume discretization.
+
+    The matrix depends only on the grid and the flux discretization. It is cached on
+    the grid, per keyword, and reassembled if the discretization or the cell-face
+    relation is replaced. The returned matrix should not be modified.
+
+    Parameters:
+        discr (pp.FVElliptic): Finite volume discretization.
+        sd (pp.Grid): Grid of the discretization.
+        sd_data (dict): Data dictionary of the grid.
+
+    Returns:
+        sps.spmatrix: System matrix of the discretization.
+
+    """
+    flux = sd_data[pp.DISCRETIZATION_MATRICES][discr.keyword][discr.flux_matrix_key]
+    return pp.grid_utils.cached_on_grid(
+        sd,
+        ("assembled_flux", discr.keyword, discr.flux_matrix_key),
+        lambda: discr.assemble_matrix(sd, sd_data),
+        flux,
+    )
+
+
+def _face_bound_flux(
+    sd: pp.Grid, sd_data: dict, keyword: str, key: str
+) -> sps.spmatrix:
+    """Return the boundary flux discretization stored under key, mapped to faces.
+
+    If the discretization is given on sub-faces, the mapping to faces is computed
+    once and cached on the grid, per keyword. The cache is refreshed if the
+    discretization or the cell-face relation is replaced.
+
+    Parameters:
+        sd (pp.Grid): Grid of the discretization.
+        sd_data (dict): Data dictionary of the grid.
+        keyword (str): Keyword of the discretization matrices.
+        key (str): Key of the boundary flux discretization.
+
+    Returns:
+        sps.spmatrix: Boundary flux discretization on the faces of sd.
+
+    """
+    bound_flux = sd_data[pp.DISCRETIZATION_MATRICES][keyword][key]
+    if sd.dim == 0 or bound_flux.shape[0] == sd.num_faces:
+        return bound_flux
+
+    # The bound flux is given as sub-faces, map it from sub-faces to faces
+    return pp.grid_utils.cached_on_grid(
+        sd,
+        ("face_bound_flux", keyword, key),
+        lambda: pp.fvutils.map_hf_2_f(nd=1, sd=sd) * bound_flux,
+        bound_flux,
+    )
+
+
+class _ImplicitFV(pp.FVElliptic):
     """
     Multiply all contributions by the time step.
+
+    Common implementation of ImplicitMpfa and ImplicitTpfa, which combine this class
+    with the respective finite volume discretization.
     """
 
     def assemble_matrix_rhs(self, sd: pp.Grid, sd_data: dict):
-        """Overwrite MPFA method to be consistent with the Biot dt convention."""
-        a, b = super().assemble_matrix_rhs(sd, sd_data)
+        """Overwrite FV method to be consistent with the Biot dt convention."""
         dt = sd_data[pp.PARAMETERS][self.keyword]["time_step"]
-        a = a * dt
-        b = b * dt
+        a = _assembled_flux_matrix(self, sd, sd_data).copy()
+        a.data *= dt
+        # The right-hand side depends on boundary values, and is assembled anew.
+        b = self.assemble_rhs(sd, sd_data)
+        b *= dt
         return a, b
 
     def assemble_int_bound_flux(
@@ -66,33 +152,39 @@ class ImplicitMpfa(pp.Mpfa):
         use_secondary_proj: bool = False,
     ) -> None:
         """
-        Overwrite the MPFA method to be consistent with the Biot dt convention
+        Overwrite the FV method to be consistent with the Biot dt convention
         """
         dt = sd_data[pp.PARAMETERS][self.keyword]["time_step"]
 
-        div = sd.cell_faces.T
+        div = _cell_faces_transposed(sd)
 
-        bound_flux = sd_data[pp.DISCRETIZATION_MATRICES][self.keyword][
-            self.bound_flux_matrix_key
-        ]
+        bound_flux = _face_bound_flux(
+            sd, sd_data, self.keyword, self.bound_flux_matrix_key
+        )
         # Projection operators to grid
         if use_secondary_proj:
             proj = intf.mortar_to_secondary_int()
         else:
             proj = intf.mortar_to_primary_int()
 
-        if sd.dim > 0 and bound_flux.shape[0] != sd.num_faces:
-            # If bound flux is given as sub-faces we have to map it from sub-faces
-            # to faces
-            hf2f = pp.fvutils.map_hf_2_f(nd=1, sd=sd)
-            bound_flux = hf2f * bound_flux
         if sd.dim > 0 and bound_flux.shape[1] != proj.shape[0]:
             raise ValueError(
                 """Inconsistent shapes. Did you define a
             sub-face boundary condition but only a face-wise mortar?"""
             )
 
-        cc[self_ind, 2] += dt * div * bound_flux * proj
+        # The product is a new matrix, thus the time step can be applied to its data
+        # rather than to a copy of the (larger) divergence operator.
+        flux = div @ bound_flux @ proj
+        flux.data *= dt
+        # An empty block of the same shape is replaced rather than added to; the
+        # addition would also convert it to the format of flux. Blocks of another
+        # shape are left to the addition, which raises an error.
+        block = cc[self_ind, 2]
+        if block.nnz == 0 and block.shape == flux.shape:
+            cc[self_ind, 2] = flux
+        else:
+            cc[self_ind, 2] += flux
 
     def assemble_int_bound_source(
         self,
@@ -140,107 +232,55 @@ class ImplicitMpfa(pp.Mpfa):
         cc[self_ind, 2] -= proj * dt
 
 
-class ImplicitTpfa(pp.Tpfa):
+class ImplicitMpfa(_ImplicitFV, pp.Mpfa):
     """
     Multiply all contributions by the time step.
+    """
 
-    Implementation note: This is a copy of ImplicitMpfa, modified to inherit from Tpfa.
-    A unified implementation would have been preferable.
 
+class ImplicitTpfa(_ImplicitFV, pp.Tpfa):
+    """
+    Multiply all contributions by the time step.
     """
 
-    def assemble_matrix_rhs(self, sd: pp.Grid, sd_data: dict):
-        """Overwrite MPFA method to be consistent with the Biot dt convention."""
-        a, b = super().assemble_matrix_rhs(sd, sd_data)
 
-        dt = sd_data[pp.PARAMETERS][self.keyword]["time_step"]
-        a = a * dt
-        b = b * dt
-        return a, b
+@lru_cache(maxsize=32, typed=True)
+def _constant_array(n_vals: int, value: numbers.Number) -> np.ndarray:
+    """Return a read-only array of size n_vals filled with a scalar value.
 
-    def assemble_int_bound_flux(
-        self,
-        sd: pp.Grid,
-        sd_data: dict,
-        intf: pp.MortarGrid,
-        intf_data: dict,
-        cc: np.ndarray,
-        matrix: sps.spmatrix,
-        rhs: np.ndarray,
-        self_ind: int,
-        use_secondary_proj: bool = False,
-    ) -> None:
-        """
-        Overwrite the MPFA method to be consistent with the Biot dt convention
-        """
-        dt = sd_data[pp.PARAMETERS][self.keyword]["time_step"]
+    The array is shared between calls with the same arguments, and is made read-only
+    to prevent modifications from propagating between the callers.
 
-        div = sd.cell_faces.T
+    """
+    # Same dtype as in the expansion of scalars in pp.Parameters.
+    array = np.full(n_vals, value, dtype=np.result_type(type(value), float))
+    array.flags.writeable = False
+    return array
 
-        bound_flux = sd_data[pp.DISCRETIZATION_MATRICES][self.keyword]["bound_flux"]
-        # Projection operators to grid
-        if use_secondary_proj:
-            proj = intf.mortar_to_secondary_int()
-        else:
-            proj = intf.mortar_to_primary_int()
 
-        if sd.dim > 0 and bound_flux.shape[0] != sd.num_faces:
-            # If bound flux is given as sub-faces we have to map it from sub-faces
-            # to faces
-            hf2f = pp.fvutils.map_hf_2_f(nd=1, sd=sd)
-            bound_flux = hf2f * bound_flux
-        if sd.dim > 0 and bound_flux.shape[1] != proj.shape[0]:
-            raise ValueError(
-                """Inconsistent shapes. Did you define a
-            sub-face boundary condition but only a face-wise mortar?"""
-            )
+def _advection_weight(
+    sd: pp.Grid, parameter_dictionary: pp.Parameters, keyword: str
+) -> np.ndarray:
+    """Return the cell-wise advection weights of a grid.
 
-        cc[self_ind, 2] += dt * div * bound_flux * proj
+    Scalar weights are expanded to arrays which are reused between calls, thus the
+    returned array should not be modified.
 
-    def assemble_int_bound_source(
-        self,
-        sd: pp.Grid,
-        sd_data: dict,
-        intf: pp.MortarGrid,
-        intf_data: dict,
-        cc: np.ndarray,
-        matrix: sps.spmatrix,
-        rhs: np.ndarray,
-        self_ind: int,
-    ) -> None:
-        """Abstract method. Assemble the contribution from an internal
-        boundary, manifested as a source term.
+    Parameters:
+        sd (pp.Grid): Grid.
+        parameter_dictionary (pp.Parameters): Parameters of the grid.
+        keyword (str): Keyword of the advection weight.
 
-        The intended use is when the internal boundary is coupled to another
-        node in a mixed-dimensional method. Specific usage depends on the
-        interface condition between the nodes; this method will typically be
-        used to impose flux continuity on a lower-dimensional domain.
-
-        Implementations of this method will use an interplay between the grid on
-        the node and the mortar grid on the relevant edge.
+    Returns:
+        np.ndarray (sd.num_cells): Advection weights.
 
-        Parameters:
-            sd (pp.Grid): Grid which the condition should be imposed on.
-            sd_data (dictionary): Data dictionary for the node in the
-                mixed-dimensional grid.
-            intf (pp.MortarGrid): interface
-            intf_data (dictionary): Data dictionary for the edge in the
-                mixed-dimensional grid.
-            cc (block matrix, 3x3): Block matrix for the coupling condition.
-                The first and second rows and columns are identified with the
-                primary and secondary side; the third belongs to the edge variable.
-                The discretization of the relevant term is done in-place in cc.
-            matrix (block matrix 3x3): Discretization matrix for the edge and
-                the two adjacent nodes.
-            rhs (block_array 3x1): Right-hand side contribution for the edge and
-                the two adjacent nodes.
-            self_ind (int): Index in cc and matrix associated with this node.
-                Should be either 1 or 2.
-
-        """
-        proj = intf.mortar_to_secondary_int()
-        dt = sd_data[pp.PARAMETERS][self.keyword]["time_step"]
-        cc[self_ind, 2] -= proj * dt
+    """
+    value = parameter_dictionary[keyword].get("advection_weight")
+    if isinstance(value, numbers.Number):
+        return _constant_array(sd.num_cells, value)
+    return parameter_dictionary.expand_scalars(
+        sd.num_cells, keyword, ["advection_weight"]
+    )[0]
 
 
 class ImplicitUpwind(pp.Upwind):
@@ -261,18 +301,133 @@ class ImplicitUpwind(pp.Upwind):
         parameter_dictionary = sd_data[pp.PARAMETERS]
         dt = parameter_dictionary[self.keyword]["time_step"]
         # Obtain the cell-wise advection weights
-        w = (
-            parameter_dictionary.expand_scalars(
-                sd.num_cells, self.keyword, ["advection_weight"]
-            )[0]
-            * dt
-        )
+        w = _advection_weight(sd, parameter_dictionary, self.keyword) * dt
         a, b = super().assemble_matrix_rhs(sd, sd_data)
-        a = a * sps.diags(w)
-        b = b * sps.diags(w)
+        # Right multiplication by diag(w) scales the columns of the matrix and the
+        # entries of the right-hand side vector.
+        a = a.tocsr()
+        a.data *= w[a.indices]
+        if np.can_cast(w.dtype, b.dtype, casting="same_kind"):
+            np.multiply(b, w, out=b)
+        else:
+            # The right-hand side is not guaranteed to be of floating point type.
+            b = b * w
         return a, b
 
 
+@numba.njit(cache=True, nogil=True)
+def _coupling_weights(lam_flux, w_primary, w_secondary, dt):
+    """Compute the weights of the upwind coupling in a single pass.
+
+    Parameters:
+        lam_flux (np.ndarray): Mortar fluxes.
+        w_primary (np.ndarray): Advection weights of the primary grid cells.
+        w_secondary (np.ndarray): Advection weights of the secondary grid cells.
+        dt (float): Time step.
+
+    Returns:
+        np.ndarray: Primary advection weights scaled by the time step.
+        np.ndarray: Secondary advection weights scaled by the time step.
+        np.ndarray: Positive part of the mortar fluxes.
+        np.ndarray: Negative part of the mortar fluxes.
+
+    """
+    w_primary_dt = np.empty(w_primary.size)
+    for i in range(w_primary.size):
+        w_primary_dt[i] = w_primary[i] * dt
+    w_secondary_dt = np.empty(w_secondary.size)
+    for i in range(w_secondary.size):
+        w_secondary_dt[i] = w_secondary[i] * dt
+
+    pos_flux = np.zeros(lam_flux.size)
+    neg_flux = np.zeros(lam_flux.size)
+    for i in range(lam_flux.size):
+        if lam_flux[i] > 0:
+            pos_flux[i] = lam_flux[i]
+        else:
+            neg_flux[i] = lam_flux[i]
+    return w_primary_dt, w_secondary_dt, pos_flux, neg_flux
+
+
+def _abs_scalar_divergence(sd: pp.Grid) -> sps.csr_matrix:
+    """Return the absolute value of the scalar divergence of a grid.
+
+    The result is cached on the grid, so that it is shared between all interfaces of
+    the grid. It is recomputed if the cell-face relation is replaced.
+
+    Parameters:
+        sd (pp.Grid): Grid.
+
+    Returns:
+        sps.csr_matrix (sd.num_cells x sd.num_faces): Unsigned divergence.
+
+    """
+
+    def compute() -> sps.csr_matrix:
+        # The divergence may share its data with the cell-face relation, hence the
+        # copy before the absolute value is taken in place.
+        div = pp.fvutils.scalar_divergence(sd).tocsr(copy=True)
+        np.abs(div.data, out=div.data)
+        return div
+
+    return pp.grid_utils.cached_on_grid(sd, "abs_scalar_divergence", compute)
+
+
+def _upwind_coupling_structure(
+    sd_primary: pp.Grid, intf: pp.MortarGrid, intf_data: dict
+) -> dict:
+    """Construct the flux independent parts of the upwind coupling blocks.
+
+    The result is cached in the interface data, tied to the projection matrices of
+    the mortar grid and the cell-face relation of the primary grid. If any of these
+    are replaced, the structure is recomputed.
+
+    Parameters:
+        sd_primary (pp.Grid): Grid of higher dimension.
+        intf (pp.MortarGrid): Interface.
+        intf_data (dict): Data dictionary of the interface.
+
+    Returns:
+        dict: The constant blocks "primary_trace", "secondary_trace" and "mortar",
+            and csr templates "primary_flux" and "secondary_flux" for the blocks
+            which are scaled by the mortar flux and advection weights, together with
+            the row index of each of their nonzero entries.
+
+    """
+    hat_P_avg = intf.primary_to_mortar_avg()
+    check_P_avg = intf.secondary_to_mortar_avg()
+    sources = (hat_P_avg, check_P_avg, sd_primary.cell_faces)
+
+    cache = intf_data.get("_upwind_coupling_structure")
+    if cache is not None and all(a is b for a, b in zip(cache[0], sources)):
+        return cache[1]
+
+    hat_P_avg = hat_P_avg.tocsr()
+    check_P_avg = check_P_avg.tocsr()
+    # mapping from upper dim cells to faces
+    # The mortars always points from upper to lower, so we don't flip any
+    # signs
+    div = _abs_scalar_divergence(sd_primary)
+
+    primary_flux = (hat_P_avg @ div.T).tocsr()
+    secondary_flux = check_P_avg.copy()
+    structure = {
+        "primary_trace": div * hat_P_avg.T,
+        "secondary_trace": -check_P_avg.T,
+        "mortar": -sps.eye(intf.num_cells),
+        "primary_flux": primary_flux,
+        "primary_flux_rows": np.repeat(
+            np.arange(primary_flux.shape[0]), np.diff(primary_flux.indptr)
+        ),
+        "secondary_flux": secondary_flux,
+        "secondary_flux_rows": np.repeat(
+            np.arange(secondary_flux.shape[0]), np.diff(secondary_flux.indptr)
+        ),
+    }
+    intf_data["_upwind_coupling_structure"] = (sources, structure)
+    return structure
+
+
 class ImplicitUpwindCoupling(pp.UpwindCoupling):
     """
     Multiply the advective mortar fluxes by the time step and advection weight.
@@ -317,17 +472,15 @@ class ImplicitUpwindCoupling(pp.UpwindCoupling):
         parameter_dictionary_secondary = sd_data_secondary[pp.PARAMETERS]
         lam_flux = intf_data[pp.PARAMETERS][self.keyword]["darcy_flux"]
         dt = parameter_dictionary_primary[self.keyword]["time_step"]
-        w_primary = (
-            parameter_dictionary_primary.expand_scalars(
-                sd_primary.num_cells, self.keyword, ["advection_weight"]
-            )[0]
-            * dt
-        )
-        w_secondary = (
-            parameter_dictionary_secondary.expand_scalars(
-                sd_secondary.num_cells, self.keyword, ["advection_weight"]
-            )[0]
-            * dt
+        # Upwind weighting: For positive fluxes we use the upper weights, else we use
+        # the lower weights.
+        w_primary, w_secondary, pos_flux, neg_flux = _coupling_weights(
+            np.asarray(lam_flux, dtype=float),
+            _advection_weight(sd_primary, parameter_dictionary_primary, self.keyword),
+            _advection_weight(
+                sd_secondary, parameter_dictionary_secondary, self.keyword
+            ),
+            dt,
         )
         # Retrieve the number of degrees of both grids
         # Create the block matrix for the contributions
@@ -335,30 +488,22 @@ class ImplicitUpwindCoupling(pp.UpwindCoupling):
         # We know the number of dofs from the primary and secondary side from their
         # discretizations
         dof = np.array([matrix[0, 0].shape[1], matrix[1, 1].shape[1], intf.num_cells])
-        cc = np.array([sps.coo_matrix((i, j)) for i in dof for j in dof])
-        cc = cc.reshape((3, 3))
+        # Only five of the nine blocks receive contributions. The remaining blocks
+        # are left as scalar zeros, which are neutral when added to the sparse
+        # blocks of matrix, thus no empty sparse matrices need to be created.
+        cc = np.zeros((3, 3), dtype=object)
 
-        # Projection from mortar to upper dimensional faces
-        hat_P_avg = intf.primary_to_mortar_avg()
-        # Projection from mortar to lower dimensional cells
-        check_P_avg = intf.secondary_to_mortar_avg()
-
-        # mapping from upper dim cells to faces
-        # The mortars always points from upper to lower, so we don't flip any
-        # signs
-        div = np.abs(pp.numerics.fv.fvutils.scalar_divergence(sd_primary))
-
-        # Find upwind weighting. if flag is True we use the upper weights
-        # if flag is False we use the lower weighs
-        flag = (lam_flux > 0).astype(float)
-        not_flag = 1 - flag
+        # The sparsity structure of the coupling blocks depends only on the grids,
+        # thus it is computed once. Only the values of the mortar flux blocks change
+        # between assemblies.
+        structure = _upwind_coupling_structure(sd_primary, intf, intf_data)
 
         # assemble matrices
         # Transport out of upper equals lambda
-        cc[0, 2] = div * hat_P_avg.T
+        cc[0, 2] = structure["primary_trace"]
 
         # transport out of lower is -lambda
-        cc[1, 2] = -check_P_avg.T
+        cc[1, 2] = structure["secondary_trace"]
 
         # Discretization of mortars
         # CHANGE from UpwindCoupling: multiply the discretization of the advective
@@ -367,23 +512,37 @@ class ImplicitUpwindCoupling(pp.UpwindCoupling):
         # If fluid flux(lam_flux) is positive we use the upper value as weight,
         # i.e., T_primaryat * fluid_flux = lambda.
         # We set cc[2, 0] = T_primaryat * fluid_flux
-        cc[2, 0] = sps.diags(lam_flux * flag) * hat_P_avg * div.T * sps.diags(w_primary)
+        # The diagonal scalings are applied directly to the rows and columns of the
+        # template, rather than by multiplication with diagonal matrices.
+        template = structure["primary_flux"]
+        data = template.data * pos_flux[structure["primary_flux_rows"]]
+        data *= w_primary[template.indices]
+        cc[2, 0] = sps.csr_matrix(
+            (data, template.indices, template.indptr), shape=template.shape
+        )
 
         # If fluid flux is negative we use the lower value as weight,
         # i.e., T_check * fluid_flux = lambda.
         # we set cc[2, 1] = T_check * fluid_flux
-        cc[2, 1] = sps.diags(lam_flux * not_flag) * check_P_avg * sps.diags(w_secondary)
+        template = structure["secondary_flux"]
+        data = template.data * neg_flux[structure["secondary_flux_rows"]]
+        data *= w_secondary[template.indices]
+        cc[2, 1] = sps.csr_matrix(
+            (data, template.indices, template.indptr), shape=template.shape
+        )
 
         # The rhs of T * fluid_flux = lambda
         # Recover the information for the grid-grid mapping
-        cc[2, 2] = -sps.eye(intf.num_cells)
+        cc[2, 2] = structure["mortar"]
 
         if sd_primary == sd_secondary:
             # All contributions to be returned to the same block of the
             # global matrix in this case
-            cc = np.array([np.sum(cc, axis=(0, 1))])
+            cc = np.array([cc[0, 2] + cc[1, 2] + cc[2, 0] + cc[2, 1] + cc[2, 2]])
 
-        # rhs is zero
-        rhs = np.squeeze([np.zeros(dof[0]), np.zeros(dof[1]), np.zeros(dof[2])])
+        # rhs is zero. The blocks are views into a single array.
+        rhs = np.empty(3, dtype=object)
+        for i, block in enumerate(np.split(np.zeros(dof.sum()), np.cumsum(dof)[:-1])):
+            rhs[i] = block
         matrix += cc
         return matrix, rhs
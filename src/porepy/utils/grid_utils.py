@@ -1,10 +1,14 @@
 """Module contains various utility functions for working with grids.
 """
+from typing import Any, Callable, Hashable, TypeVar
+
 import numpy as np
 import scipy.sparse as sps
 
 import porepy as pp
 
+T = TypeVar("T")
+
 
 def switch_sign_if_inwards_normal(
     g: pp.Grid, nd: int, faces: np.ndarray
@@ -112,3 +116,40 @@ def star_shape_cell_centers(g: "pp.Grid", as_nan: bool = False) -> np.ndarray:
 
     # shift back the computed cell centers and return them
     return cell_centers + np.tile(xn_shift, (g.num_cells, 1)).T
+
+
+def cached_on_grid(
+    g: "pp.Grid", key: Hashable, compute: Callable[[], T], *depends_on: Any
+) -> T:
+    """Return a quantity derived from a grid, computing it only if needed.
+
+    The quantity is cached on the grid, together with the cell-face relation of the
+    grid and the objects given in depends_on. It is recomputed if any of these has
+    been replaced by another object since it was computed; modifications in place
+    are not detected. There is a single entry per key, which is overwritten when the
+    quantity is recomputed.
+
+    Parameters:
+        g (pp.Grid): Grid.
+        key (Hashable): Identifier of the quantity.
+        compute (Callable): Function without arguments which computes the quantity.
+        *depends_on (Any): Further objects the quantity depends on, compared by
+            identity.
+
+    Returns:
+        The quantity. It is shared with the cache, and should not be modified.
+
+    """
+    cache: dict = g.__dict__.setdefault("_derived_quantities", {})
+    dependencies = (g.cell_faces,) + depends_on
+    entry = cache.get(key)
+    if (
+        entry is not None
+        and len(entry[0]) == len(dependencies)
+        and all(a is b for a, b in zip(entry[0], dependencies))
+    ):
+        return entry[1]
+
+    value = compute()
+    cache[key] = (dependencies, value)
+    return value
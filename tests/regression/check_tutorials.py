@@ -1,30 +1,44 @@
-import os
 import glob
+import os
 from typing import Optional
 
+import nbformat
+from jupyter_client.manager import AsyncKernelManager
+from jupyter_core.utils import run_sync
+from nbclient import NotebookClient
+
+TUTORIALS_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "tutorials")
+)
+
+# Code run before each tutorial. The namespace of the previous tutorial is cleared,
+# and the working directory restored, while the imported modules, and thus the
+# compiled numba functions, are kept.
+_RESET_SOURCE = f"%reset -f\nimport os\nos.chdir({TUTORIALS_DIR!r})\ndel os"
+
 
 def run_all(files: Optional[list[str]] = None):
-    os.chdir("../../tutorials")
-    failed = False
-    failed_files = []
     if files is None:
-        files = glob.glob("*.ipynb")
-    for file in files:
-        new_file = file[:-6] + ".py"
-        cmd_convert = "jupyter nbconvert --to script " + file
-        os.system(cmd_convert)
-        remove_plots(new_file)
-
-        cmd_run = "python " + str(new_file)
-        status = os.system(cmd_run)
-        if status != 0:
-            print("\n")
-            print("*********************\n")
-            print(file + " failed\n\n")
-            print("********************\n")
-            failed = True
-            failed_files.append(file)
-        os.remove(new_file)
+        files = sorted(
+            os.path.basename(f)
+            for f in glob.glob(os.path.join(TUTORIALS_DIR, "*.ipynb"))
+        )
+    failed_files = []
+    # The tutorials are run one after the other on the same kernel, so that the
+    # interpreter is started, and porepy imported, only once.
+    km = AsyncKernelManager(kernel_name="python3")
+    run_sync(km.start_kernel)(cwd=TUTORIALS_DIR)
+    try:
+        for file in files:
+            if not _run_one(file, km):
+                print("\n")
+                print("*********************\n")
+                print(file + " failed\n\n")
+                print("********************\n")
+                failed_files.append(file)
+    finally:
+        run_sync(km.shutdown_kernel)(now=True)
+    failed = len(failed_files) > 0
     if not failed:
         print("********************\n")
         print("All tutorials ran. \n")
@@ -37,37 +51,55 @@ def run_all(files: Optional[list[str]] = None):
     assert not failed
 
 
-def remove_plots(fn):
-    with open(fn) as f:
-        content = f.readlines()
-
-    with open(fn, "w") as f:
-        for line in content:
-            if line.strip()[:9] == "plot_grid":
-                continue
-            if line.strip()[:12] == "pp.plot_grid":
-                continue
-            if line.strip()[:4] == "plt.":
-                continue
-            if line.strip()[:17] == "pp.plot_fractures":
-                continue
-            if line.strip()[:11] == "get_ipython":
-                continue
-            if line.strip()[:15] == "network_2d.plot":
-                continue
-            if line.strip()[:6] == "print(":
-                continue
-            if "vtk" in line:
-                continue
-            if "Exporter" in line:
-                continue
-            if "exporter" in line:
-                continue
-            if "write" in line:
-                continue
-            if "import plot_grid" in line:
-                continue
-            f.write(line)
+def _run_one(file: str, km: AsyncKernelManager) -> bool:
+    # Execute the notebook without plotting, rather than converting it to a script
+    # and running the script in a new interpreter.
+    nb = nbformat.read(os.path.join(TUTORIALS_DIR, file), as_version=4)
+    for cell in nb.cells:
+        if cell.cell_type == "code":
+            cell.source = remove_plots(cell.source)
+    nb.cells.insert(0, nbformat.v4.new_code_cell(_RESET_SOURCE))
+
+    client = NotebookClient(nb, km=km, resources={"metadata": {"path": TUTORIALS_DIR}})
+    try:
+        client.execute()
+    except Exception as err:
+        # Failures which are not raised by a cell, such as a dead kernel or a kernel
+        # which fails to start, should also be recorded without stopping the other
+        # tutorials. A dead kernel is restarted for the remaining tutorials.
+        print(f"{file}: {type(err).__name__}: {err}")
+        if not run_sync(km.is_alive)():
+            run_sync(km.restart_kernel)(now=True)
+        return False
+    finally:
+        if client.kc is not None:
+            client.kc.stop_channels()
+    return True
+
+
+# Lines starting with one of these prefixes, or containing one of the substrings, are
+# removed from the tutorials before they are run.
+_SKIP_PREFIXES = (
+    "plot_grid",
+    "pp.plot_grid",
+    "plt.",
+    "pp.plot_fractures",
+    "get_ipython",
+    "network_2d.plot",
+    "print(",
+)
+_SKIP_SUBSTRINGS = ("vtk", "Exporter", "exporter", "write", "import plot_grid")
+
+
+def _keep(line: str) -> bool:
+    return not (
+        line.lstrip().startswith(_SKIP_PREFIXES)
+        or any(sub in line for sub in _SKIP_SUBSTRINGS)
+    )
+
+
+def remove_plots(source: str) -> str:
+    return "".join(line for line in source.splitlines(keepends=True) if _keep(line))
 
 
 if __name__ == "__main__":
@@ -1545,6 +1545,68 @@ class TestAssembler(unittest.TestCase):
         self.assertTrue(variable_name_1 in var)
         self.assertFalse(variable_name_2 in var)
 
+    def test_dof_var(self):
+        # Test the dofs of a list of variables. The dofs should be ordered by grid
+        # (subdomains before interfaces), then by the order of the input variables.
+        mdg = self.define_mdg()
+        variable_name_1 = "var_1"
+        variable_name_2 = "var_2"
+        for sd, data in mdg.subdomains(return_data=True):
+            data[pp.PRIMARY_VARIABLES] = {
+                variable_name_1: {"cells": 1},
+                variable_name_2: {"cells": 1},
+            }
+        for intf, data in mdg.interfaces(return_data=True):
+            data[pp.PRIMARY_VARIABLES] = {variable_name_1: {"cells": 1}}
+
+        dof_manager = pp.DofManager(mdg)
+
+        dofs = dof_manager.dof_var(variable_name_2)
+        self.assertTrue(np.all(dofs == np.array([1, 3])))
+
+        dofs, proj = dof_manager.dof_var(
+            [variable_name_2, variable_name_1], return_projection=True
+        )
+        self.assertTrue(np.all(dofs == np.array([1, 0, 3, 2, 4])))
+        self.assertEqual(proj.shape, (5, 5))
+
+        dofs = dof_manager.dof_var("unknown_variable")
+        self.assertEqual(dofs.size, 0)
+
+    def test_assemble_variable_subvector(self):
+        # Assemble a subset of the variables, either into a vector of full size or
+        # into a vector containing only the requested values.
+        mdg = self.define_mdg()
+        variable_name_1 = "var_1"
+        variable_name_2 = "var_2"
+        for sd, data in mdg.subdomains(return_data=True):
+            data[pp.PRIMARY_VARIABLES] = {
+                variable_name_1: {"cells": 1},
+                variable_name_2: {"cells": 1},
+            }
+            data[pp.STATE] = {
+                variable_name_1: np.array([sd.grid_num]),
+                variable_name_2: np.array([10 * sd.grid_num]),
+            }
+        for intf, data in mdg.interfaces(return_data=True):
+            data[pp.PRIMARY_VARIABLES] = {variable_name_1: {"cells": 1}}
+            data[pp.STATE] = {variable_name_1: np.array([-1])}
+
+        dof_manager = pp.DofManager(mdg)
+
+        values = dof_manager.assemble_variable(variables=[variable_name_2])
+        self.assertTrue(np.allclose(values, np.array([0, 10, 0, 20, 0])))
+
+        values = dof_manager.assemble_variable(
+            variables=[variable_name_2, variable_name_1], return_subvector=True
+        )
+        self.assertTrue(np.allclose(values, np.array([1, 10, 2, 20, -1])))
+
+        values = dof_manager.assemble_variable(
+            variables=[variable_name_2], return_subvector=True
+        )
+        self.assertTrue(np.allclose(values, np.array([10, 20])))
+
     def test_str_repr_two_nodes_different_variables(self):
         # Assign two variables, check that the string returned by __str__ and
         # __repr__ contain the correct information
@@ -0,0 +1,167 @@
+"""Tests of the matrix helpers of the dual elliptic discretizations."""
+import numpy as np
+import pytest
+import scipy.sparse as sps
+
+import porepy as pp
+from porepy.numerics.vem import dual_elliptic
+
+
+def _matrix_with_duplicates() -> sps.csr_matrix:
+    # The entries in row 0 cancel when summed, row 1 has duplicates of opposite
+    # sign, and row 2 is empty.
+    data = np.array([2.0, -2.0, 3.0, -1.0, 1.0])
+    indices = np.array([1, 1, 0, 0, 3])
+    indptr = np.array([0, 2, 4, 4, 5])
+    return sps.csr_matrix((data, indices, indptr), shape=(4, 4))
+
+
+@pytest.mark.parametrize(
+    "A",
+    [
+        sps.csr_matrix(np.array([[1.0, -2.0, 0.0], [0.0, 0.0, 0.0], [-4.0, 0, 1.0]])),
+        sps.csc_matrix(np.array([[0.0, 0.0], [3.0, -1.0], [0.0, 0.0]])),
+        sps.csr_matrix((3, 5)),
+        sps.random(20, 15, density=0.2, format="csr", random_state=42),
+        _matrix_with_duplicates(),
+    ],
+)
+def test_inf_norm(A):
+    # Note that sps.linalg.norm sums duplicate entries in place.
+    known = sps.linalg.norm(A.copy(), np.inf)
+    data = A.data.copy()
+    assert np.isclose(dual_elliptic._inf_norm(A), known)
+    # The input should not be modified.
+    assert np.array_equal(A.data, data)
+
+
+def _clear_rows_set_diagonal_reference(A, rows, value):
+    # Clear the rows (columns for csc) entry by entry and set the diagonal with
+    # scipy.
+    A = A.copy()
+    for row in rows:
+        A.data[A.indptr[row] : A.indptr[row + 1]] = 0.0
+    d = A.diagonal()
+    d[rows] = value
+    A.setdiag(d)
+    return A
+
+
+def _matrix_with_diagonal(fmt: str) -> sps.spmatrix:
+    A = sps.random(8, 8, density=0.3, format=fmt, random_state=3)
+    return (A + sps.diags(np.arange(1.0, 9.0))).asformat(fmt)
+
+
+def _matrix_without_diagonal(fmt: str) -> sps.spmatrix:
+    A = sps.random(8, 8, density=0.3, format="lil", random_state=4)
+    A.setdiag(0)
+    return A.asformat(fmt)
+
+
+@pytest.mark.parametrize("fmt", ["csr", "csc"])
+@pytest.mark.parametrize("matrix", [_matrix_with_diagonal, _matrix_without_diagonal])
+def test_clear_rows_set_diagonal(fmt, matrix):
+    A = matrix(fmt)
+    rows = np.array([0, 3, 4, 7])
+    known = _clear_rows_set_diagonal_reference(A, rows, 2.5)
+
+    dual_elliptic._clear_rows_set_diagonal(A, rows, 2.5)
+    assert np.allclose(A.toarray(), known.toarray())
+
+
+@pytest.mark.parametrize("matrix", [_matrix_with_diagonal, _matrix_without_diagonal])
+def test_diagonal_positions(matrix):
+    A = matrix("csr")
+    # Remove a single diagonal element, so that both stored and missing diagonal
+    # elements are present.
+    A = A.tolil()
+    A[4, 4] = 0
+    A = A.tocsr()
+    rows = np.array([1, 4, 6])
+
+    pos = dual_elliptic._diagonal_positions(A, rows)
+    # Rows among the sought ones which have a stored diagonal element.
+    coo = A.tocoo()
+    stored = rows[np.isin(rows, coo.row[coo.row == coo.col])]
+    assert pos.size == stored.size
+    assert np.array_equal(A.indices[pos], stored)
+    assert np.allclose(A.data[pos], A.diagonal()[stored])
+
+
+@pytest.mark.parametrize("matrix", [_matrix_with_diagonal, _matrix_without_diagonal])
+def test_add_to_diagonal(matrix):
+    A = matrix("csr")
+    rows = np.array([1, 4, 6])
+    values = np.array([1.0, -2.0, 3.0])
+    known = A + sps.csr_matrix((values, (rows, rows)), shape=A.shape)
+
+    B = dual_elliptic._add_to_diagonal(A, rows, values)
+    assert np.allclose(B.toarray(), known.toarray())
+
+
+def _spd_stack(dim: int, num: int) -> np.ndarray:
+    # Stack of random symmetric positive definite matrices, dim x dim x num.
+    rng = np.random.default_rng(0)
+    B = rng.random((num, dim, dim))
+    K = B @ B.transpose((0, 2, 1)) + dim * np.eye(dim)
+    return np.ascontiguousarray(K.transpose((1, 2, 0)))
+
+
+def test_inv_matrix_3d_sym_batch():
+    K = _spd_stack(3, 50)
+    out = np.empty_like(K)
+    dual_elliptic._inv_matrix_3d_sym_batch(K, out)
+
+    known = np.linalg.inv(K.transpose((2, 0, 1))).transpose((1, 2, 0))
+    assert np.allclose(out, known)
+
+
+@pytest.mark.parametrize("dim", [1, 2, 3])
+def test_inv_permeability_reuses_buffer(dim):
+    sd = pp.CartGrid(np.full(dim, 3))
+    K = _spd_stack(dim, sd.num_cells)
+    known = np.linalg.inv(K.transpose((2, 0, 1))).transpose((1, 2, 0))
+
+    # Without a matrix dictionary, a new array is returned by each call.
+    inv_K = dual_elliptic.DualElliptic._inv_permeability(sd, K)
+    assert np.allclose(inv_K, known)
+    assert dual_elliptic.DualElliptic._inv_permeability(sd, K) is not inv_K
+
+    # With a matrix dictionary, the result is written to a buffer stored there. A
+    # second call with the same dictionary overwrites the previous result, while
+    # the buffer of another keyword is left untouched.
+    flow, transport = {}, {}
+    inv_K = dual_elliptic.DualElliptic._inv_permeability(sd, K, flow)
+    inv_K_transport = dual_elliptic.DualElliptic._inv_permeability(sd, K, transport)
+    assert inv_K is not inv_K_transport
+
+    inv_K2 = dual_elliptic.DualElliptic._inv_permeability(sd, 2 * K, flow)
+    assert inv_K2 is inv_K
+    assert np.allclose(inv_K2, known / 2)
+    assert np.allclose(inv_K_transport, known)
+
+
+def test_velocity_dof_cached_per_grid():
+    # Two grids sharing an interface, with the same projection used from both sides.
+    # Alternating calls should hit the cache, rather than evicting each other.
+    mdg = pp.meshing.cart_grid([np.array([[0, 2], [1, 1]])], [2, 2])
+    intf = mdg.interfaces()[0]
+    sd_1 = mdg.subdomains(dim=2)[0]
+    sd_2 = sd_1.copy()
+    sd_2.cell_faces = sd_1.cell_faces.copy()
+    proj = intf.primary_to_mortar_int().T.tocsc()
+
+    velocity_dof = dual_elliptic.DualElliptic._velocity_dof
+    first_1 = velocity_dof(sd_1, intf, proj)
+    first_2 = velocity_dof(sd_2, intf, proj)
+    assert velocity_dof(sd_1, intf, proj) is first_1
+    assert velocity_dof(sd_2, intf, proj) is first_2
+
+
+@pytest.mark.parametrize("dim", [1, 2, 3])
+def test_inv_matrix(dim):
+    K = _spd_stack(dim, 1)[:, :, 0]
+    inv_matrix = getattr(dual_elliptic.DualElliptic, f"_inv_matrix_{dim}d")
+    inv_K = inv_matrix(K)
+    assert inv_K.shape == (dim, dim)
+    assert np.allclose(inv_K, np.linalg.inv(K))
@@ -751,5 +751,35 @@ def test_pickle_mortar_grid(g):
     test_utils.delete_file(fn)
 
 
+def test_cached_on_grid():
+    g = pp.CartGrid([2, 2])
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return np.arange(len(calls))
+
+    dependency = np.zeros(3)
+    value = pp.grid_utils.cached_on_grid(g, "foo", compute, dependency)
+    assert pp.grid_utils.cached_on_grid(g, "foo", compute, dependency) is value
+    assert len(calls) == 1
+
+    # Replacing a dependency triggers recomputation.
+    dependency = np.zeros(3)
+    value = pp.grid_utils.cached_on_grid(g, "foo", compute, dependency)
+    assert len(calls) == 2
+
+    # So does replacing the cell-face relation of the grid.
+    g.cell_faces = g.cell_faces.copy()
+    pp.grid_utils.cached_on_grid(g, "foo", compute, dependency)
+    assert len(calls) == 3
+
+    # Another key is computed and stored separately.
+    pp.grid_utils.cached_on_grid(g, "bar", compute)
+    assert len(calls) == 4
+    pp.grid_utils.cached_on_grid(g, "foo", compute, dependency)
+    assert len(calls) == 4
+
+
 if __name__ == "__main__":
     unittest.main()